@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Tuple
 from functools import lru_cache
 
 
@@ -10,13 +10,13 @@ class Settings(BaseSettings):
     DEBUG: bool = True
     
     # CORS
-    CORS_ORIGINS: List[str] = [
+    CORS_ORIGINS: Tuple[str, ...] = (
         "http://localhost:5173",  # Vite dev server
         "http://localhost:3000",  # Common dev server
         "http://localhost:8080",  # Vite dev server (configured port)
         "http://127.0.0.1:5173",
         "http://127.0.0.1:8080",
-    ]
+    )
     
     # AWS Configuration
     AWS_REGION: str = "us-east-1"
@@ -33,6 +33,7 @@ class Settings(BaseSettings):
     
     # Feature flags
     SMS_ENABLED: bool = False  # Set to True to enable SMS via SNS
+    BEDROCK_PROMPT_CACHING: bool = False  # Cache the static analysis prompt (model must support cachePoint)
     
     # Storage
     TEMP_UPLOAD_DIR: str = "/tmp/accessai/uploads"
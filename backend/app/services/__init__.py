@@ -3,7 +3,7 @@
 from app.services.aws_service import aws_service, initialize_services
 from app.services.ocr_service import ocr_service
 from app.services.medical_analysis import medical_analysis_service
-from app.services.session_store import sessions_store, analysis_cache, audio_cache
+from app.services.session_store import sessions_store, analysis_cache, audio_cache, scheme_cache
 from app.services.scheme_rag import scheme_rag_service
 from app.services.pii_anonymizer import pii_anonymiser
 
@@ -15,6 +15,7 @@ __all__ = [
     "sessions_store",
     "analysis_cache",
     "audio_cache",
+    "scheme_cache",
     "scheme_rag_service",
     "pii_anonymiser",
 ]
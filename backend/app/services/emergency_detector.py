@@ -6,10 +6,26 @@ Uses panic value ranges defined by clinical laboratory standards (AACC/CAP).
 
 import logging
 import re
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 
 logger = logging.getLogger(__name__)
 
+_NUMERIC = re.compile(r"(\d+\.?\d*)")
+_DIGIT = re.compile(r"\d")
+
+
+@lru_cache(maxsize=1024)
+def _extract_numeric_cached(value_str: str) -> Optional[float]:
+    """First number in a value string; lab values like "8.2 g/dL" recur constantly."""
+    match = _NUMERIC.search(value_str)
+    if match:
+        try:
+            return float(match.group(1))
+        except ValueError:
+            return None
+    return None
+
 
 class EmergencyDetector:
     """
@@ -135,6 +151,15 @@ class EmergencyDetector:
         },
     }
 
+    # One alternation over every analyte name, followed by its value;
+    # a single finditer pass finds all of them
+    _PANIC_PATTERN = re.compile(
+        r"(\b(?:" + "|".join(re.escape(k) for k in PANIC_VALUES) + r")\b)"
+        r"[\s:.\-]*"
+        r"(\d+\.?\d*)\s*",
+        re.IGNORECASE,
+    )
+
     # India-specific emergency numbers and resources
     EMERGENCY_RESOURCES = {
         "ambulance": "108",
@@ -154,8 +179,14 @@ class EmergencyDetector:
         Scan for critical/panic lab values in extracted text and analysis results.
         Returns emergency alerts if any are found.
         """
+        # Fast path: no structured input and no digits in the text → nothing to find
+        if not key_findings and not abnormal_values and not (
+            extracted_text and _DIGIT.search(extracted_text)
+        ):
+            return self._no_emergency()
+
         alerts: List[Dict[str, Any]] = []
-        
+
         # Method 1: Check from structured key_findings
         if key_findings:
             for finding in key_findings:
@@ -177,11 +208,7 @@ class EmergencyDetector:
                 alerts.append(alert)
 
         if not alerts:
-            return {
-                "has_emergency": False,
-                "alerts": [],
-                "emergency_resources": {},
-            }
+            return self._no_emergency()
 
         # Sort by severity (highest first)
         severity_order = {"critical": 0, "urgent": 1}
@@ -199,6 +226,15 @@ class EmergencyDetector:
             ),
         }
 
+    @staticmethod
+    def _no_emergency() -> Dict[str, Any]:
+        """Result when nothing critical is found (fresh each call; callers may mutate it)."""
+        return {
+            "has_emergency": False,
+            "alerts": [],
+            "emergency_resources": {},
+        }
+
     def _check_finding(self, finding: Dict) -> Optional[Dict]:
         """Check a key finding against panic values."""
         test_name = finding.get("test_name", "").strip().lower()
@@ -272,15 +308,10 @@ class EmergencyDetector:
     def _scan_text_for_panic_values(self, text: str) -> List[Dict]:
         """Regex-based scan for panic values in raw text."""
         alerts = []
-        
-        pattern = re.compile(
-            r"(\b(?:" + "|".join(re.escape(k) for k in self.PANIC_VALUES.keys()) + r")\b)"
-            r"[\s:.\-]*"
-            r"(\d+\.?\d*)\s*",
-            re.IGNORECASE,
-        )
-
-        for match in pattern.finditer(text):
+        if not text or not _DIGIT.search(text):
+            return alerts
+
+        for match in self._PANIC_PATTERN.finditer(text):
             test_name = match.group(1).strip().lower()
             try:
                 value = float(match.group(2))
@@ -295,13 +326,7 @@ class EmergencyDetector:
 
     def _extract_numeric(self, value_str: str) -> Optional[float]:
         """Extract first numeric value from a string."""
-        match = re.search(r"(\d+\.?\d*)", str(value_str))
-        if match:
-            try:
-                return float(match.group(1))
-            except ValueError:
-                return None
-        return None
+        return _extract_numeric_cached(str(value_str).strip())
 
     def _is_duplicate(self, alert: Dict, existing: List[Dict]) -> bool:
         """Check if an alert already exists (by test name)."""
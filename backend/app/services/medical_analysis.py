@@ -4,15 +4,76 @@ Generates structured medical summaries with sections,
 key findings, abnormal values, things to note, and doctor questions.
 """
 
-import json
+import asyncio
+import hashlib
 import logging
 import re
+from collections import namedtuple
+from functools import lru_cache
 from typing import Dict, Any, Optional, List
 
+import numpy as np
+import orjson
+
 from app.core.config import settings
+from app.services.session_store import QueryCache
 
 logger = logging.getLogger(__name__)
 
+# Reference interval for one analyte: general low/high bounds and unit, plus
+# optional sex-specific (low, high) pairs
+RefRange = namedtuple("RefRange", "low high unit male female", defaults=(None, None))
+
+# Optional: RE2 (linear-time DFA) for the abnormal-value scan; falls back to re
+try:
+    import re2 as _rex
+    RE2_AVAILABLE = True
+except ImportError:
+    _rex = re
+    RE2_AVAILABLE = False
+
+_DIGIT = re.compile(r"\d")
+
+# Where a JSON reply may sit inside chattier LLM output
+_JSON_FENCE = re.compile(r"```(?:json)?\s*([\s\S]*?)```")
+_JSON_OBJECT = re.compile(r"(\{[\s\S]*\})")
+
+# Language directive written into every prompt; unknown codes get English
+_LANGUAGE_INSTRUCTIONS = {
+    "en": "Respond in English.",
+    "hi": "Respond in Hindi (हिंदी में जवाब दें).",
+    "kn": "Respond in Kannada (ಕನ್ನಡದಲ್ಲಿ ಉತ್ತರಿಸಿ).",
+}
+
+# Report-data part of the analysis prompt; filled with one format() call
+_TAIL_TEMPLATE = """MEDICAL REPORT TEXT:
+---
+{text}
+---
+{kv_section}
+{table_section}
+Respond ONLY with the JSON object described above."""
+
+# Unstructured-reply result; callers get fresh lists copied from the tuples
+_FALLBACK_TEMPLATE = {
+    "things_to_note": ("The AI response could not be fully structured. Please review the summary.",),
+    "questions_for_doctor": (
+        "What do the results in my report mean?",
+        "Are any values outside the normal range?",
+        "What follow-up tests or actions do you recommend?",
+        "Should I make any lifestyle changes based on these results?",
+        "When should I get tested again?",
+    ),
+    "confidence_notes": "Analysis confidence is reduced because the response could not be fully structured.",
+}
+
+# Hedging phrases in the LLM's confidence_notes, matched case-insensitively.
+# The lookahead reports every starting position, so one pass finds each
+# phrase even where two overlap.
+_UNCERTAINTY_PATTERN = re.compile(
+    r"(?i)(?=(uncertain|unclear|not sure|limited|partial|incomplete|could not))"
+)
+
 
 class MedicalAnalysisService:
     """
@@ -22,68 +83,86 @@ class MedicalAnalysisService:
 
     # Common medical reference ranges for abnormal value detection
     REFERENCE_RANGES = {
-        "hemoglobin": {"unit": "g/dL", "male": (14.0, 18.0), "female": (12.0, 16.0), "general": (12.0, 18.0)},
-        "hb": {"unit": "g/dL", "male": (14.0, 18.0), "female": (12.0, 16.0), "general": (12.0, 18.0)},
-        "wbc": {"unit": "cells/mcL", "general": (4500, 11000)},
-        "rbc": {"unit": "million/mcL", "male": (4.7, 6.1), "female": (4.2, 5.4), "general": (4.2, 6.1)},
-        "platelets": {"unit": "/mcL", "general": (150000, 400000)},
-        "glucose": {"unit": "mg/dL", "general": (70, 100)},
-        "fasting glucose": {"unit": "mg/dL", "general": (70, 100)},
-        "hba1c": {"unit": "%", "general": (4.0, 5.7)},
-        "cholesterol": {"unit": "mg/dL", "general": (0, 200)},
-        "total cholesterol": {"unit": "mg/dL", "general": (0, 200)},
-        "hdl": {"unit": "mg/dL", "general": (40, 60)},
-        "ldl": {"unit": "mg/dL", "general": (0, 100)},
-        "triglycerides": {"unit": "mg/dL", "general": (0, 150)},
-        "creatinine": {"unit": "mg/dL", "male": (0.7, 1.3), "female": (0.6, 1.1), "general": (0.6, 1.3)},
-        "bun": {"unit": "mg/dL", "general": (7, 20)},
-        "urea": {"unit": "mg/dL", "general": (15, 45)},
-        "alt": {"unit": "U/L", "general": (7, 56)},
-        "sgpt": {"unit": "U/L", "general": (7, 56)},
-        "ast": {"unit": "U/L", "general": (10, 40)},
-        "sgot": {"unit": "U/L", "general": (10, 40)},
-        "tsh": {"unit": "mIU/L", "general": (0.4, 4.0)},
-        "t3": {"unit": "ng/dL", "general": (80, 200)},
-        "t4": {"unit": "mcg/dL", "general": (4.5, 12.0)},
-        "vitamin d": {"unit": "ng/mL", "general": (30, 100)},
-        "vitamin b12": {"unit": "pg/mL", "general": (200, 900)},
-        "iron": {"unit": "mcg/dL", "general": (60, 170)},
-        "ferritin": {"unit": "ng/mL", "male": (20, 250), "female": (10, 120), "general": (10, 250)},
-        "calcium": {"unit": "mg/dL", "general": (8.5, 10.5)},
-        "sodium": {"unit": "mEq/L", "general": (136, 145)},
-        "potassium": {"unit": "mEq/L", "general": (3.5, 5.0)},
-        "uric acid": {"unit": "mg/dL", "male": (3.4, 7.0), "female": (2.4, 6.0), "general": (2.4, 7.0)},
-        "bilirubin": {"unit": "mg/dL", "general": (0.1, 1.2)},
-        "albumin": {"unit": "g/dL", "general": (3.5, 5.5)},
-        "esr": {"unit": "mm/hr", "male": (0, 15), "female": (0, 20), "general": (0, 20)},
+        "hemoglobin": RefRange(12.0, 18.0, "g/dL", male=(14.0, 18.0), female=(12.0, 16.0)),
+        "hb": RefRange(12.0, 18.0, "g/dL", male=(14.0, 18.0), female=(12.0, 16.0)),
+        "wbc": RefRange(4500, 11000, "cells/mcL"),
+        "rbc": RefRange(4.2, 6.1, "million/mcL", male=(4.7, 6.1), female=(4.2, 5.4)),
+        "platelets": RefRange(150000, 400000, "/mcL"),
+        "glucose": RefRange(70, 100, "mg/dL"),
+        "fasting glucose": RefRange(70, 100, "mg/dL"),
+        "hba1c": RefRange(4.0, 5.7, "%"),
+        "cholesterol": RefRange(0, 200, "mg/dL"),
+        "total cholesterol": RefRange(0, 200, "mg/dL"),
+        "hdl": RefRange(40, 60, "mg/dL"),
+        "ldl": RefRange(0, 100, "mg/dL"),
+        "triglycerides": RefRange(0, 150, "mg/dL"),
+        "creatinine": RefRange(0.6, 1.3, "mg/dL", male=(0.7, 1.3), female=(0.6, 1.1)),
+        "bun": RefRange(7, 20, "mg/dL"),
+        "urea": RefRange(15, 45, "mg/dL"),
+        "alt": RefRange(7, 56, "U/L"),
+        "sgpt": RefRange(7, 56, "U/L"),
+        "ast": RefRange(10, 40, "U/L"),
+        "sgot": RefRange(10, 40, "U/L"),
+        "tsh": RefRange(0.4, 4.0, "mIU/L"),
+        "t3": RefRange(80, 200, "ng/dL"),
+        "t4": RefRange(4.5, 12.0, "mcg/dL"),
+        "vitamin d": RefRange(30, 100, "ng/mL"),
+        "vitamin b12": RefRange(200, 900, "pg/mL"),
+        "iron": RefRange(60, 170, "mcg/dL"),
+        "ferritin": RefRange(10, 250, "ng/mL", male=(20, 250), female=(10, 120)),
+        "calcium": RefRange(8.5, 10.5, "mg/dL"),
+        "sodium": RefRange(136, 145, "mEq/L"),
+        "potassium": RefRange(3.5, 5.0, "mEq/L"),
+        "uric acid": RefRange(2.4, 7.0, "mg/dL", male=(3.4, 7.0), female=(2.4, 6.0)),
+        "bilirubin": RefRange(0.1, 1.2, "mg/dL"),
+        "albumin": RefRange(3.5, 5.5, "g/dL"),
+        "esr": RefRange(0, 20, "mm/hr", male=(0, 15), female=(0, 20)),
     }
 
-    def _build_structured_prompt(
-        self,
-        extracted_text: str,
-        language: str,
-        key_value_pairs: Optional[List[Dict]] = None,
-        tables: Optional[List] = None,
-        user_context: Optional[Dict] = None,
-    ) -> str:
-        lang_instruction = {
-            "en": "Respond in English.",
-            "hi": "Respond in Hindi (हिंदी में जवाब दें).",
-            "kn": "Respond in Kannada (ಕನ್ನಡದಲ್ಲಿ ಉತ್ತರಿಸಿ).",
-        }.get(language, "Respond in English.")
+    # Pattern: "Test Name: Value Unit" or "Test Name  Value  Unit"
+    # (compiled once from REFERENCE_RANGES, not per call; inline flags so
+    # the same source compiles under RE2 and re)
+    _VALUE_PATTERN = _rex.compile(
+        r"(?i)(\b(?:" + "|".join(re.escape(k) for k in REFERENCE_RANGES) + r")\b)"
+        r"[\s:.\-]*"
+        r"(\d+\.?\d*)\s*"
+        r"([a-zA-Z/%]+)?"
+    )
+
+    # Shortest text that can hold a match: shortest analyte name plus one digit
+    _MIN_MATCH_LEN = min(len(k) for k in REFERENCE_RANGES) + 1
+
+    # Structure-of-arrays view of the general bounds, indexed by analyte,
+    # so every match in a document is classified in one vectorised compare
+    _RANGE_INDEX = {name: i for i, name in enumerate(REFERENCE_RANGES)}
+    _RANGE_LOW = np.array([ref.low for ref in REFERENCE_RANGES.values()], dtype=np.float64)
+    _RANGE_HIGH = np.array([ref.high for ref in REFERENCE_RANGES.values()], dtype=np.float64)
+    _RANGE_LABEL = tuple(f"{ref.low}-{ref.high} {ref.unit}" for ref in REFERENCE_RANGES.values())
+    # (value > high) - (value < low) -> 0, 1 or -1
+    _STATUS_BY_SIGN = ("normal", "high", "low")
+
+    _REPLY_CACHE_SIZE = 256
+    _REPLY_CACHE_TTL = 1800  # seconds
+
+    def __init__(self):
+        # Raw LLM replies that parsed to a structured analysis, keyed by
+        # report-data digest + language, so re-uploads of the same report skip
+        # Bedrock; unusable replies are never stored, so a retry calls again
+        self._reply_cache = QueryCache(
+            max_entries=self._REPLY_CACHE_SIZE, ttl_seconds=self._REPLY_CACHE_TTL
+        )
 
-        kv_section = ""
-        if key_value_pairs:
-            kv_lines = [f"  - {kv['key']}: {kv['value']}" for kv in key_value_pairs[:50]]
-            kv_section = "\nEXTRACTED KEY-VALUE PAIRS:\n" + "\n".join(kv_lines)
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def _static_header(language: str) -> str:
+        """Invariant prompt prefix (rules + JSON schema) for a language.
 
-        table_section = ""
-        if tables:
-            for idx, table in enumerate(tables[:5]):
-                rows_str = "\n".join(["  | " + " | ".join(row) + " |" for row in table[:20]])
-                table_section += f"\nTABLE {idx + 1}:\n{rows_str}\n"
+        Kept first in the prompt so Bedrock prompt caching can reuse it
+        across requests; only the report data after it varies.
+        """
+        lang_instruction = _LANGUAGE_INSTRUCTIONS.get(language, _LANGUAGE_INSTRUCTIONS["en"])
 
-        prompt = f"""You are AccessAI, a medical report analysis assistant. Your goal is to help
+        return f"""You are AccessAI, a medical report analysis assistant. Your goal is to help
 patients understand their medical reports in simple, everyday language.
 
 IMPORTANT RULES:
@@ -98,14 +177,7 @@ IMPORTANT RULES:
 8. Begin the summary with: "⚕️ This is an AI-generated interpretation for informational purposes only. Always consult a qualified medical professional."
 9. For EACH key finding, include the field "source" indicating where in the report the value was found (e.g. "Row 3 of CBC table", "Line: Hemoglobin 12.5 g/dL"). If unclear, say "Derived from report text".
 
-MEDICAL REPORT TEXT:
----
-{extracted_text}
----
-{kv_section}
-{table_section}
-
-Please respond ONLY in valid JSON with this exact structure:
+The medical report follows these instructions. Please respond ONLY in valid JSON with this exact structure:
 {{
   "summary": "A 3-5 sentence plain-language overview of what this report is about.",
   "key_findings": [
@@ -141,9 +213,51 @@ Please respond ONLY in valid JSON with this exact structure:
   "confidence_notes": "A brief statement about how confident you are in this analysis and any limitations"
 }}
 
-CRITICAL: Respond ONLY with valid JSON. No markdown, no code blocks, no extra text."""
+CRITICAL: Respond ONLY with valid JSON. No markdown, no code blocks, no extra text.
+
+"""
+
+    @staticmethod
+    def _dynamic_tail(
+        extracted_text: str,
+        key_value_pairs: Optional[List[Dict]] = None,
+        tables: Optional[List] = None,
+    ) -> str:
+        """Per-request report data appended after the static header."""
+        kv_section = ""
+        if key_value_pairs:
+            kv_section = "\nEXTRACTED KEY-VALUE PAIRS:\n" + "\n".join(
+                [f"  - {kv['key']}: {kv['value']}" for kv in key_value_pairs[:50]]
+            )
+
+        table_section = ""
+        if tables:
+            table_section = "".join([
+                "\nTABLE {}:\n{}\n".format(
+                    idx, "\n".join(["  | " + " | ".join(row) + " |" for row in table[:20]])
+                )
+                for idx, table in enumerate(tables[:5], 1)
+            ])
+
+        return _TAIL_TEMPLATE.format(
+            text=extracted_text, kv_section=kv_section, table_section=table_section
+        )
 
-        return prompt
+    def _converse_request(self, tail: str, language: str) -> Dict[str, Any]:
+        """Converse `system`/`messages` arguments for an analysis request.
+
+        With prompt caching on, the static header becomes a cached system
+        block and only the report data (`tail`) is sent as the user turn.
+        """
+        header = self._static_header(language)
+        if settings.BEDROCK_PROMPT_CACHING:
+            return {
+                "system": [{"text": header}, {"cachePoint": {"type": "default"}}],
+                "messages": [{"role": "user", "content": [{"text": tail}]}],
+            }
+
+        prompt = "".join([header, tail])
+        return {"messages": [{"role": "user", "content": [{"text": prompt}]}]}
 
     async def analyze(
         self,
@@ -157,21 +271,28 @@ CRITICAL: Respond ONLY with valid JSON. No markdown, no code blocks, no extra te
     ) -> Dict[str, Any]:
         """Generate structured medical analysis."""
 
-        prompt = self._build_structured_prompt(
-            extracted_text, language, key_value_pairs, tables, user_context
-        )
+        tail = self._dynamic_tail(extracted_text, key_value_pairs, tables)
+        cache_key = self._reply_key(tail)
 
         try:
-            response = bedrock_runtime.converse(
-                modelId=settings.AWS_BEDROCK_MODEL_ID,
-                messages=[{"role": "user", "content": [{"text": prompt}]}],
-                inferenceConfig={"maxTokens": 4096, "temperature": 0.3},
-            )
-
-            raw_text = response["output"]["message"]["content"][0]["text"]
-
-            # Parse JSON response
-            analysis = self._parse_analysis_response(raw_text)
+            cached = self._reply_cache.get(cache_key, language)
+            raw_text = cached["raw_text"] if cached else None
+            if raw_text is None:
+                # boto3 blocks for the whole generation; keep the event loop free
+                response = await asyncio.to_thread(
+                    bedrock_runtime.converse,
+                    modelId=settings.AWS_BEDROCK_MODEL_ID,
+                    inferenceConfig={"maxTokens": 4096, "temperature": 0.3},
+                    **self._converse_request(tail, language),
+                )
+                raw_text = response["output"]["message"]["content"][0]["text"]
+
+            # Parse JSON response; only replies that parsed are reused
+            analysis = self._parse_structured(raw_text)
+            if analysis is None:
+                analysis = self._fallback_analysis(raw_text)
+            elif cached is None:
+                self._reply_cache.set(cache_key, language, {"raw_text": raw_text})
 
             # Calculate confidence
             confidence = self._calculate_confidence(
@@ -192,45 +313,53 @@ CRITICAL: Respond ONLY with valid JSON. No markdown, no code blocks, no extra te
             logger.error(f"Medical analysis failed: {e}")
             raise
 
+    @staticmethod
+    def _reply_key(tail: str) -> str:
+        # The dynamic tail is exactly the report data the LLM sees; the static
+        # header only varies by language, which QueryCache keys separately.
+        # A hex digest stays well under QueryCache's 500-char key prefix, so
+        # reports that share an opening never collide.
+        return hashlib.blake2b(tail.encode(), digest_size=16).hexdigest()
+
     def _parse_analysis_response(self, raw_text: str) -> Dict[str, Any]:
         """Parse the LLM JSON response, with fallback for malformed output."""
+        analysis = self._parse_structured(raw_text)
+        return analysis if analysis is not None else self._fallback_analysis(raw_text)
+
+    @staticmethod
+    def _parse_structured(raw_text: str) -> Optional[Dict[str, Any]]:
+        """The JSON object in the LLM reply, or None if it holds none."""
         # Try direct JSON parse
         try:
-            return json.loads(raw_text)
-        except json.JSONDecodeError:
+            parsed = orjson.loads(raw_text)
+            if isinstance(parsed, dict):
+                return parsed
+        except orjson.JSONDecodeError:
             pass
 
-        # Try extracting JSON from markdown code block
-        json_match = re.search(r"```(?:json)?\s*([\s\S]*?)```", raw_text)
-        if json_match:
-            try:
-                return json.loads(json_match.group(1))
-            except json.JSONDecodeError:
-                pass
-
-        # Try finding JSON object in text
-        brace_match = re.search(r"\{[\s\S]*\}", raw_text)
-        if brace_match:
-            try:
-                return json.loads(brace_match.group(0))
-            except json.JSONDecodeError:
-                pass
-
-        # Fallback: return unstructured
+        # Try extracting JSON from markdown code block, then any {...} span
+        for pattern in (_JSON_FENCE, _JSON_OBJECT):
+            match = pattern.search(raw_text)
+            if match:
+                try:
+                    parsed = orjson.loads(match.group(1))
+                    if isinstance(parsed, dict):
+                        return parsed
+                except orjson.JSONDecodeError:
+                    pass
+        return None
+
+    @staticmethod
+    def _fallback_analysis(raw_text: str) -> Dict[str, Any]:
+        """Unstructured result wrapping a reply that held no JSON object."""
         logger.warning("Could not parse structured JSON from LLM, returning raw text")
         return {
             "summary": raw_text[:1000],
             "key_findings": [],
             "abnormal_values": [],
-            "things_to_note": ["The AI response could not be fully structured. Please review the summary."],
-            "questions_for_doctor": [
-                "What do the results in my report mean?",
-                "Are any values outside the normal range?",
-                "What follow-up tests or actions do you recommend?",
-                "Should I make any lifestyle changes based on these results?",
-                "When should I get tested again?",
-            ],
-            "confidence_notes": "Analysis confidence is reduced because the response could not be fully structured.",
+            "things_to_note": list(_FALLBACK_TEMPLATE["things_to_note"]),
+            "questions_for_doctor": list(_FALLBACK_TEMPLATE["questions_for_doctor"]),
+            "confidence_notes": _FALLBACK_TEMPLATE["confidence_notes"],
         }
 
     def _calculate_confidence(
@@ -255,13 +384,10 @@ CRITICAL: Respond ONLY with valid JSON. No markdown, no code blocks, no extra te
         # --- 2. Extraction completeness (25%) ---
         findings_count = len(analysis.get("key_findings", []))
         text_len = len(text)
-        # score rises with more findings and longer text
-        if text_len < 100:
-            extraction = 20.0
-        elif text_len < 300:
-            extraction = 40.0
-        else:
-            extraction = min(60.0 + findings_count * 5.0, 100.0)
+        # score rises with more findings and longer text: tier 0 (<100 chars),
+        # 1 (<300) or 2, picked by summing the threshold comparisons
+        length_tier = (text_len >= 100) + (text_len >= 300)
+        extraction = (20.0, 40.0, min(60.0 + findings_count * 5.0, 100.0))[length_tier]
         breakdown["extraction_completeness"] = round(extraction, 1)
 
         # --- 3. Abnormal-value certainty (25%) ---
@@ -279,9 +405,9 @@ CRITICAL: Respond ONLY with valid JSON. No markdown, no code blocks, no extra te
         breakdown["abnormal_value_certainty"] = round(abnormal_cert, 1)
 
         # --- 4. LLM self-evaluation (20%) ---
-        notes = analysis.get("confidence_notes", "").lower()
-        uncertainty_words = ["uncertain", "unclear", "not sure", "limited", "partial", "incomplete", "could not"]
-        uncertainty_hits = sum(1 for w in uncertainty_words if w in notes)
+        notes = analysis.get("confidence_notes") or ""
+        # only the short matched phrases are lowercased, not the whole notes
+        uncertainty_hits = len({hit.lower() for hit in _UNCERTAINTY_PATTERN.findall(notes)})
         llm_self = max(100.0 - uncertainty_hits * 20.0, 10.0)
         breakdown["llm_self_evaluation"] = round(llm_self, 1)
 
@@ -305,42 +431,43 @@ CRITICAL: Respond ONLY with valid JSON. No markdown, no code blocks, no extra te
         against LLM output (source grounding).
         """
         results = []
-        text_lower = text.lower()
-
-        # Pattern: "Test Name: Value Unit" or "Test Name  Value  Unit"
-        value_pattern = re.compile(
-            r"(\b(?:" + "|".join(re.escape(k) for k in self.REFERENCE_RANGES.keys()) + r")\b)"
-            r"[\s:.\-]*"
-            r"(\d+\.?\d*)\s*"
-            r"([a-zA-Z/%]+)?",
-            re.IGNORECASE,
-        )
-
-        for match in value_pattern.finditer(text):
-            test_name = match.group(1).strip().lower()
+        # Nothing to match without room for a name + value, or without a digit
+        if len(text) < self._MIN_MATCH_LEN or not _DIGIT.search(text):
+            return results
+
+        index = self._RANGE_INDEX
+        names: List[str] = []
+        positions: List[int] = []
+        values: List[float] = []
+
+        for match in self._VALUE_PATTERN.finditer(text):
+            test_name = match.group(1).lower()
+            pos = index.get(test_name)
+            if pos is None:
+                continue
             try:
                 value = float(match.group(2))
             except ValueError:
                 continue
+            names.append(test_name)
+            positions.append(pos)
+            values.append(value)
 
-            ref = self.REFERENCE_RANGES.get(test_name)
-            if not ref:
-                continue
-
-            range_info = ref.get("general", (0, 0))
-            low, high = range_info
+        if not positions:
+            return results
 
-            status = "normal"
-            if value < low:
-                status = "low"
-            elif value > high:
-                status = "high"
+        idx = np.array(positions, dtype=np.intp)
+        vals = np.array(values, dtype=np.float64)
+        signs = (vals > self._RANGE_HIGH[idx]).astype(np.int8) - (vals < self._RANGE_LOW[idx])
 
+        labels = self._RANGE_LABEL
+        statuses = self._STATUS_BY_SIGN
+        for test_name, value, pos, sign in zip(names, values, positions, signs.tolist()):
             results.append({
                 "test_name": test_name,
                 "extracted_value": value,
-                "reference_range": f"{low}-{high} {ref.get('unit', '')}",
-                "status": status,
+                "reference_range": labels[pos],
+                "status": statuses[sign],
             })
 
         return results
@@ -354,11 +481,7 @@ CRITICAL: Respond ONLY with valid JSON. No markdown, no code blocks, no extra te
         language: str = "en",
     ) -> Dict[str, Any]:
         """Generate response to a follow-up question about the report."""
-        lang_instruction = {
-            "en": "Respond in English.",
-            "hi": "Respond in Hindi (हिंदी में जवाब दें).",
-            "kn": "Respond in Kannada (ಕನ್ನಡದಲ್ಲಿ ಉತ್ತರಿಸಿ).",
-        }.get(language, "Respond in English.")
+        lang_instruction = _LANGUAGE_INSTRUCTIONS.get(language, _LANGUAGE_INSTRUCTIONS["en"])
 
         summary = previous_analysis.get("summary", "")
 
@@ -390,7 +513,8 @@ Respond in JSON:
 }}"""
 
         try:
-            response = bedrock_runtime.converse(
+            response = await asyncio.to_thread(
+                bedrock_runtime.converse,
                 modelId=settings.AWS_BEDROCK_MODEL_ID,
                 messages=[{"role": "user", "content": [{"text": prompt}]}],
                 inferenceConfig={"maxTokens": 1024, "temperature": 0.3},
@@ -399,11 +523,11 @@ Respond in JSON:
             raw = response["output"]["message"]["content"][0]["text"]
 
             try:
-                return json.loads(raw)
-            except json.JSONDecodeError:
-                json_match = re.search(r"\{[\s\S]*\}", raw)
+                return orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                json_match = _JSON_OBJECT.search(raw)
                 if json_match:
-                    return json.loads(json_match.group(0))
+                    return orjson.loads(json_match.group(1))
                 return {
                     "answer": raw[:1000],
                     "related_values": [],
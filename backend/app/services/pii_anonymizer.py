@@ -31,6 +31,7 @@ Configurable via environment:
 
 from __future__ import annotations
 
+import bisect
 import hashlib
 import logging
 import re
@@ -39,10 +40,18 @@ import time
 import uuid
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Optional: RE2 for a one-pass prefilter over every pattern; falls back to re
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    re2 = None
+    RE2_AVAILABLE = False
+
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  Constants & configuration
@@ -91,28 +100,47 @@ _VERHOEFF_P = [
 ]
 _VERHOEFF_INV = [0, 4, 3, 2, 1, 5, 6, 7, 8, 9]
 
+# Combined step table: _VERHOEFF_STEP[i % 8][c][ord(digit)] == D[c][P[i % 8][d]].
+# Rows are indexed by the digit's ASCII code (48-57) so an ASCII number can
+# be walked straight from its encoded bytes, with no int() per character.
+_VERHOEFF_STEP = tuple(
+    tuple(
+        bytes(48) + bytes(_VERHOEFF_D[c][_VERHOEFF_P[i][d]] for d in range(10))
+        for c in range(10)
+    )
+    for i in range(8)
+)
+
+
+# Luhn: digit sum of 2*d, indexed by the digit's ASCII code
+_LUHN_DOUBLED = bytes(48) + bytes(sum(divmod(d * 2, 10)) for d in range(10))
+
+
+def _digit_codes(number: str) -> bytes:
+    """ASCII codes of the digits in *number* (any Unicode digit), in order."""
+    if number.isascii() and number.isdigit():
+        return number.encode()
+    return bytes(int(d) + 48 for d in number if d.isdigit())
+
 
 def _verhoeff_checksum(number: str) -> bool:
     """Validate a number string using the Verhoeff algorithm."""
-    digits = [int(d) for d in reversed(number) if d.isdigit()]
-    if len(digits) < 2:
+    codes = _digit_codes(number)[::-1]
+    if len(codes) < 2:
         return False
     c = 0
-    for i, d in enumerate(digits):
-        c = _VERHOEFF_D[c][_VERHOEFF_P[i % 8][d]]
+    for step, code in zip(_VERHOEFF_STEP * (len(codes) // 8 + 1), codes):
+        c = step[c][code]
     return c == 0
 
 
 def _luhn_checksum(number: str) -> bool:
     """Validate a number string using the Luhn algorithm (credit/debit cards)."""
-    digits = [int(d) for d in number if d.isdigit()]
-    if len(digits) < 2:
+    codes = _digit_codes(number)
+    if len(codes) < 2:
         return False
-    odd_digits = digits[-1::-2]
-    even_digits = digits[-2::-2]
-    total = sum(odd_digits)
-    for d in even_digits:
-        total += sum(divmod(d * 2, 10))
+    kept = codes[-1::-2]
+    total = sum(kept) - 48 * len(kept) + sum(map(_LUHN_DOUBLED.__getitem__, codes[-2::-2]))
     return total % 10 == 0
 
 
@@ -120,7 +148,7 @@ def _luhn_checksum(number: str) -> bool:
 #  Data structures
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-@dataclass
+@dataclass(slots=True)
 class PIIEntity:
     """A single detected PII span."""
     entity_type: str          # NAME, PHONE, EMAIL, ADDRESS, AADHAAR, PAN …
@@ -138,12 +166,25 @@ class PIIMapping:
     original_to_placeholder: Dict[str, str] = field(default_factory=dict)
     entity_counts: Dict[str, int] = field(default_factory=dict)
     _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    # (placeholder count, alternation of every placeholder) for deanonymise;
+    # rebuilt whenever the mapping has grown since it was compiled.
+    _deanon_re: Optional[Tuple[int, "re.Pattern[str]"]] = field(
+        default=None, repr=False, compare=False
+    )
 
     def add(self, entity_type: str, original: str) -> str:
         """Register a PII value and return its placeholder. Thread-safe."""
+        # Repeat values are answered without the lock: a single dict read is
+        # atomic, and original_to_placeholder is written last below, so a hit
+        # always has its reverse entry in place.
+        placeholder = self.original_to_placeholder.get(original)
+        if placeholder is not None:
+            return placeholder
+
         with self._lock:
-            if original in self.original_to_placeholder:
-                return self.original_to_placeholder[original]
+            placeholder = self.original_to_placeholder.get(original)
+            if placeholder is not None:
+                return placeholder
 
             count = self.entity_counts.get(entity_type, 0) + 1
             self.entity_counts[entity_type] = count
@@ -153,17 +194,25 @@ class PIIMapping:
             self.original_to_placeholder[original] = placeholder
             return placeholder
 
+    def bind(self, placeholder: str, original: str) -> None:
+        """Record a caller-built *placeholder* for *original*. Thread-safe."""
+        with self._lock:
+            self.placeholder_to_original[placeholder] = original
+            self.original_to_placeholder[original] = placeholder
+
     def deanonymise(self, text: str) -> str:
         """Replace all placeholders in *text* with their original values."""
-        result = text
-        # Sort by longest placeholder first to avoid partial replacements
-        for placeholder in sorted(
-            self.placeholder_to_original, key=len, reverse=True
-        ):
-            result = result.replace(
-                placeholder, self.placeholder_to_original[placeholder]
-            )
-        return result
+        p2o = self.placeholder_to_original
+        if not p2o:
+            return text
+        cached = self._deanon_re
+        if cached is None or cached[0] != len(p2o):
+            # Longest placeholder first so [NAME_1] never shadows [NAME_10]
+            pattern = re.compile("|".join(
+                re.escape(ph) for ph in sorted(p2o, key=len, reverse=True)
+            ))
+            cached = self._deanon_re = (len(p2o), pattern)
+        return cached[1].sub(lambda m: p2o[m.group(0)], text)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -196,6 +245,36 @@ class PIIAuditEntry:
     duration_ms: float
 
 
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  Regex helpers
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def _regex_opt(words) -> str:
+    """
+    Regex alternation matching exactly *words*, with shared prefixes
+    factored into a trie (``okaxis|okicici`` → ``ok(?:axis|icici)``) so the
+    backtracking engine tests each common prefix once, not once per word.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, Any]) -> str:
+        optional = "" in node
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if optional:
+            return ("(?:" + body + ")?") if len(branches) == 1 else body + "?"
+        return body
+
+    return emit(trie)
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  Medical-context false-positive suppression
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -222,8 +301,29 @@ _MEDICAL_CONTEXT_KEYWORDS: FrozenSet[str] = frozenset({
     "count", "index", "ratio", "level", "value", "result",
 })
 
+# All keywords as one prefix-factored alternation: a single search per line
+# instead of one substring scan per keyword.  Case-insensitive, so the line
+# is searched in place rather than copied and lowercased.
+_MEDICAL_CONTEXT_PATTERN = re.compile(
+    _regex_opt(_MEDICAL_CONTEXT_KEYWORDS), re.IGNORECASE
+)
+
+
+_NEWLINE = re.compile("\n")
 
-def _is_medical_context(text: str, start: int, end: int) -> bool:
+
+def _line_breaks(text: str) -> List[int]:
+    """Sorted offsets of every newline in *text*, for :func:`_is_medical_context`."""
+    return [m.start() for m in _NEWLINE.finditer(text)]
+
+
+def _is_medical_context(
+    text: str,
+    start: int,
+    end: int,
+    line_breaks: Optional[List[int]] = None,
+    cache: Optional[Dict[Tuple[int, int], bool]] = None,
+) -> bool:
     """
     Return True if the span [start:end] is likely a lab value / medical
     measurement rather than PII.
@@ -231,21 +331,53 @@ def _is_medical_context(text: str, start: int, end: int) -> bool:
     Checks the **same line** as the match for medical keywords/units.
     This avoids false-positive suppression when PII (e.g. a phone number)
     happens to be near (but on a different line from) lab results.
+
+    *line_breaks* (from :func:`_line_breaks`) lets a caller checking many
+    spans of one text locate each line by bisection instead of rescanning.
+    *cache*, shared across those calls, keeps each line's verdict so a
+    line with several numeric candidates is searched once.
     """
     # Find the line containing the match
-    line_start = text.rfind("\n", 0, start) + 1
-    line_end = text.find("\n", end)
-    if line_end == -1:
-        line_end = len(text)
-    line = text[line_start:line_end].lower()
-
-    return any(kw in line for kw in _MEDICAL_CONTEXT_KEYWORDS)
+    if line_breaks is None:
+        line_start = text.rfind("\n", 0, start) + 1
+        line_end = text.find("\n", end)
+        if line_end == -1:
+            line_end = len(text)
+    else:
+        i = bisect.bisect_left(line_breaks, start)
+        line_start = line_breaks[i - 1] + 1 if i else 0
+        j = bisect.bisect_left(line_breaks, end, i)
+        line_end = line_breaks[j] if j < len(line_breaks) else len(text)
+
+    if cache is not None:
+        verdict = cache.get((line_start, line_end))
+        if verdict is not None:
+            return verdict
+    verdict = _MEDICAL_CONTEXT_PATTERN.search(text, line_start, line_end) is not None
+    if cache is not None:
+        cache[(line_start, line_end)] = verdict
+    return verdict
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  Regex-based PII detector – comprehensive India-specific patterns
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
+# State / UT codes that open a Driving Licence number
+_DL_STATE_CODES = (
+    "AN", "AP", "AR", "AS", "BR", "CG", "CH", "DD", "DL", "GA", "GJ", "HP",
+    "HR", "JH", "JK", "KA", "KL", "LA", "LD", "MH", "ML", "MN", "MP", "MZ",
+    "NL", "OD", "OR", "PB", "PY", "RJ", "SK", "TN", "TS", "TR", "UK", "UP", "WB",
+)
+
+# UPI handle suffixes (user@provider)
+_UPI_PROVIDERS = (
+    "upi", "paytm", "ybl", "okhdfcbank", "okicici", "oksbi", "okaxis", "ibl",
+    "apl", "axisbank", "icici", "sbi", "hdfcbank", "kotak", "indus", "federal",
+    "rbl", "idbi", "boi", "pnb", "unionbank", "canara", "bob", "citi",
+)
+
+
 @dataclass(frozen=True)
 class _PatternDef:
     """Defines one regex PII pattern with metadata."""
@@ -254,6 +386,7 @@ class _PatternDef:
     confidence: float = 0.90
     validator: Optional[str] = None  # "verhoeff" | "luhn" | "pan" | None
     medical_context_check: bool = False  # If True, suppress in medical context
+    requires: Optional[str] = None  # "digit" | "@" | None – cheap text precondition
     description: str = ""
 
 
@@ -269,6 +402,7 @@ _PATTERNS: List[_PatternDef] = [
         confidence=0.92,
         validator="verhoeff",
         medical_context_check=True,
+        requires="digit",
         description="Aadhaar UID (12-digit, Verhoeff-validated)",
     ),
 
@@ -280,6 +414,7 @@ _PATTERNS: List[_PatternDef] = [
         ),
         confidence=0.95,
         validator="pan",
+        requires="digit",
         description="PAN card (validated 4th-char holder type)",
     ),
 
@@ -288,6 +423,7 @@ _PATTERNS: List[_PatternDef] = [
         entity_type="VOTER_ID",
         pattern=re.compile(r"\b[A-Z]{3}\d{7}\b"),
         confidence=0.88,
+        requires="digit",
         description="Voter ID / EPIC number",
     ),
 
@@ -299,6 +435,7 @@ _PATTERNS: List[_PatternDef] = [
         ),
         confidence=0.80,
         medical_context_check=True,
+        requires="digit",
         description="Indian passport number",
     ),
 
@@ -306,11 +443,11 @@ _PATTERNS: List[_PatternDef] = [
     _PatternDef(
         entity_type="DRIVING_LICENCE",
         pattern=re.compile(
-            r"\b(?:AN|AP|AR|AS|BR|CG|CH|DD|DL|GA|GJ|HP|HR|JH|JK|KA|KL|"
-            r"LA|LD|MH|ML|MN|MP|MZ|NL|OD|OR|PB|PY|RJ|SK|TN|TS|TR|UK|"
-            r"UP|WB)[\-\s]?\d{2}[\-\s]?\d{4}[\-\s]?\d{7}\b"
+            r"\b(?:" + _regex_opt(_DL_STATE_CODES) + r")"
+            r"[\-\s]?\d{2}[\-\s]?\d{4}[\-\s]?\d{7}\b"
         ),
         confidence=0.90,
+        requires="digit",
         description="Indian Driving Licence number",
     ),
 
@@ -320,6 +457,7 @@ _PATTERNS: List[_PatternDef] = [
         pattern=re.compile(r"(?<!\d)\d{2}[\-\s]?\d{4}[\-\s]?\d{4}[\-\s]?\d{4}(?!\d)"),
         confidence=0.82,
         medical_context_check=True,
+        requires="digit",
         description="ABHA health ID (14-digit)",
     ),
 
@@ -328,6 +466,7 @@ _PATTERNS: List[_PatternDef] = [
         entity_type="IFSC",
         pattern=re.compile(r"\b[A-Z]{4}0[A-Z0-9]{6}\b"),
         confidence=0.92,
+        requires="digit",
         description="IFSC bank code",
     ),
 
@@ -338,6 +477,7 @@ _PATTERNS: List[_PatternDef] = [
             r"(?i)(?:a/?c|account|acct)[\s.:]*(?:no\.?\s*)?(\d[\d\s\-]{7,17}\d)\b"
         ),
         confidence=0.88,
+        requires="digit",
         description="Indian bank account number (context label required)",
     ),
 
@@ -345,12 +485,11 @@ _PATTERNS: List[_PatternDef] = [
     _PatternDef(
         entity_type="UPI_ID",
         pattern=re.compile(
-            r"\b[a-zA-Z0-9._-]+@(?:upi|paytm|ybl|okhdfcbank|okicici|oksbi|"
-            r"okaxis|ibl|apl|axisbank|icici|sbi|hdfcbank|kotak|indus|"
-            r"federal|rbl|idbi|boi|pnb|unionbank|canara|bob|citi)\b",
+            r"\b[a-zA-Z0-9._-]+@(?:" + _regex_opt(_UPI_PROVIDERS) + r")\b",
             re.IGNORECASE,
         ),
         confidence=0.95,
+        requires="@",
         description="UPI virtual payment address",
     ),
 
@@ -364,6 +503,7 @@ _PATTERNS: List[_PatternDef] = [
         ),
         confidence=0.90,
         medical_context_check=True,
+        requires="digit",
         description="Indian mobile number (+91/0 prefix optional)",
     ),
 
@@ -376,6 +516,7 @@ _PATTERNS: List[_PatternDef] = [
         ),
         confidence=0.85,
         medical_context_check=True,
+        requires="digit",
         description="Indian landline with STD code",
     ),
 
@@ -384,6 +525,7 @@ _PATTERNS: List[_PatternDef] = [
         entity_type="PHONE",
         pattern=re.compile(r"(?<!\d)1(?:800|860)[\-\s]?\d{3}[\-\s]?\d{4,5}(?!\d)"),
         confidence=0.92,
+        requires="digit",
         description="Indian toll-free / helpline number",
     ),
 
@@ -397,6 +539,7 @@ _PATTERNS: List[_PatternDef] = [
             r"(?:\.[a-zA-Z]{2,})+\b"
         ),
         confidence=0.95,
+        requires="@",
         description="Email address (RFC-like)",
     ),
 
@@ -411,6 +554,7 @@ _PATTERNS: List[_PatternDef] = [
         confidence=0.80,
         validator="luhn",
         medical_context_check=True,
+        requires="digit",
         description="Credit/debit card number (Luhn-validated)",
     ),
 
@@ -425,6 +569,7 @@ _PATTERNS: List[_PatternDef] = [
             r"(\d{1,2}[\/-]\d{1,2}[\/-]\d{2,4})"
         ),
         confidence=0.93,
+        requires="digit",
         description="Date of birth with label context",
     ),
 
@@ -480,6 +625,7 @@ _PATTERNS: List[_PatternDef] = [
         ),
         confidence=0.90,
         medical_context_check=True,
+        requires="digit",
         description="Indian PIN code with label context",
     ),
 
@@ -489,6 +635,7 @@ _PATTERNS: List[_PatternDef] = [
         pattern=re.compile(r"(?<!\d)[1-9]\d{5}(?!\d)"),
         confidence=0.55,
         medical_context_check=True,
+        requires="digit",
         description="6-digit PIN code (standalone, low confidence)",
     ),
 
@@ -516,6 +663,7 @@ _PATTERNS: List[_PatternDef] = [
             r"(?:25[0-5]|2[0-4]\d|[01]?\d\d?)\b"
         ),
         confidence=0.85,
+        requires="digit",
         description="IPv4 address",
     ),
 
@@ -532,39 +680,113 @@ _PATTERNS: List[_PatternDef] = [
 ]
 
 
+# ── One-pass prefilter (RE2 set) ──────────────────────────────────────────
+#
+# All pattern sources are compiled into a single RE2 set, which reports in
+# one linear scan which patterns match anywhere; only those are then run
+# with ``re`` to recover spans and groups.  RE2 has no lookarounds, so they
+# are dropped – that only loosens a pattern, never narrows it.  RE2's \d, \w,
+# \s and \b are ASCII-only, so the set is consulted only for plain-ASCII text
+# (without the control separators Python also counts as whitespace); any
+# other text runs every pattern.
+
+_LOOKAROUND = re.compile(r"\(\?<?[!=][^()]*\)")
+_NON_RE2_SPACE = re.compile(r"[\x0b\x1c-\x1f]")
+
+
+def _build_prefilter():
+    if not RE2_AVAILABLE:
+        return None
+    try:
+        pattern_set = re2.Set.SearchSet()
+        for pdef in _PATTERNS:
+            source = _LOOKAROUND.sub("", pdef.pattern.pattern)
+            if pdef.pattern.flags & re.IGNORECASE:
+                source = "(?i)" + source
+            pattern_set.Add(source)
+        pattern_set.Compile()
+        return pattern_set
+    except Exception as exc:
+        logger.warning("RE2 PII prefilter disabled: %s", exc)
+        return None
+
+
+_PREFILTER = _build_prefilter()
+
+
+# Without the set, a pattern's ``requires`` precondition (a digit, an "@")
+# is tested once per text instead, so prose with no digits skips every
+# numeric pattern.  Candidate lists per (has digit, has "@") are built here.
+_DIGIT = re.compile(r"\d")
+_PATTERNS_BY_PRECONDITION: Dict[Tuple[bool, bool], List[_PatternDef]] = {
+    (has_digit, has_at): [
+        pdef for pdef in _PATTERNS
+        if (pdef.requires != "digit" or has_digit)
+        and (pdef.requires != "@" or has_at)
+    ]
+    for has_digit in (False, True)
+    for has_at in (False, True)
+}
+
+
+def _candidate_patterns(text: str) -> List[_PatternDef]:
+    """Patterns that can match *text*, in priority order."""
+    if _PREFILTER is None or not text.isascii() or _NON_RE2_SPACE.search(text):
+        return _PATTERNS_BY_PRECONDITION[
+            (_DIGIT.search(text) is not None, "@" in text)
+        ]
+    hits = set(_PREFILTER.Match(text))
+    return [pdef for i, pdef in enumerate(_PATTERNS) if i in hits]
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  Validators
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-def _validate_entity(pdef: _PatternDef, raw_text: str) -> bool:
-    """Run structural validation on a matched PII candidate."""
-    if pdef.validator is None:
-        return True
+_NON_DIGIT = re.compile(r"\D")
 
-    digits_only = re.sub(r"\D", "", raw_text)
 
-    if pdef.validator == "verhoeff":
-        if len(digits_only) != 12:
-            return False
-        # Aadhaar first digit must be 2-9
-        if digits_only[0] in ("0", "1"):
-            return False
-        return _verhoeff_checksum(digits_only)
+def _validate_aadhaar(raw_text: str) -> bool:
+    """12 digits, first digit 2-9, Verhoeff check digit."""
+    digits_only = _NON_DIGIT.sub("", raw_text)
+    if len(digits_only) != 12:
+        return False
+    # Aadhaar first digit must be 2-9
+    if digits_only[0] in ("0", "1"):
+        return False
+    return _verhoeff_checksum(digits_only)
+
+
+def _validate_card(raw_text: str) -> bool:
+    """13-19 digits with a Luhn check digit."""
+    digits_only = _NON_DIGIT.sub("", raw_text)
+    if len(digits_only) < 13 or len(digits_only) > 19:
+        return False
+    return _luhn_checksum(digits_only)
+
 
-    if pdef.validator == "luhn":
-        if len(digits_only) < 13 or len(digits_only) > 19:
-            return False
-        return _luhn_checksum(digits_only)
+def _validate_pan(raw_text: str) -> bool:
+    """Ten characters with a valid holder type in 4th position."""
+    # PAN is always exactly 10 chars: AAAPL1234C
+    clean = raw_text.strip()
+    if len(clean) != 10:
+        return False
+    # 4th position: valid holder type
+    return clean[3] in "ABCFGHLJPT"
+
+
+# _PatternDef.validator name → check on the matched text
+_VALIDATORS: Dict[str, Callable[[str], bool]] = {
+    "verhoeff": _validate_aadhaar,
+    "luhn": _validate_card,
+    "pan": _validate_pan,
+}
 
-    if pdef.validator == "pan":
-        # PAN is always exactly 10 chars: AAAPL1234C
-        clean = raw_text.strip()
-        if len(clean) != 10:
-            return False
-        # 4th position: valid holder type
-        return clean[3] in "ABCFGHLJPT"
 
-    return True
+def _validate_entity(pdef: _PatternDef, raw_text: str) -> bool:
+    """Run structural validation on a matched PII candidate."""
+    validator = _VALIDATORS.get(pdef.validator)
+    return validator is None or validator(raw_text)
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -578,8 +800,10 @@ def _regex_detect(text: str) -> List[PIIEntity]:
     """
     entities: List[PIIEntity] = []
     seen_spans: Set[Tuple[int, int]] = set()
+    line_breaks: Optional[List[int]] = None  # built on the first context check
+    context_by_line: Dict[Tuple[int, int], bool] = {}
 
-    for pdef in _PATTERNS:
+    for pdef in _candidate_patterns(text):
         for m in pdef.pattern.finditer(text):
             # Use group(1) if a capturing group exists, else group(0)
             if m.lastindex and m.lastindex >= 1:
@@ -605,10 +829,13 @@ def _regex_detect(text: str) -> List[PIIEntity]:
                 continue
 
             # Medical-context suppression
-            if pdef.medical_context_check and _is_medical_context(
-                text, span_start, span_end
-            ):
-                continue
+            if pdef.medical_context_check:
+                if line_breaks is None:
+                    line_breaks = _line_breaks(text)
+                if _is_medical_context(
+                    text, span_start, span_end, line_breaks, context_by_line
+                ):
+                    continue
 
             seen_spans.add(span)
             entities.append(PIIEntity(
@@ -752,20 +979,55 @@ def _merge_entities(
     )
 
     accepted: List[PIIEntity] = []
-    occupied: List[Tuple[int, int]] = []
+    # Accepted spans never overlap, so kept sorted by start their ends are
+    # sorted too: the only span that can clash with a candidate is the first
+    # one ending after the candidate's start.
+    starts: List[int] = []
+    ends: List[int] = []
 
     for ent in all_entities:
-        overlaps = any(
-            s <= ent.start < e or s < ent.end <= e or ent.start <= s < ent.end
-            for s, e in occupied
-        )
-        if not overlaps:
-            accepted.append(ent)
-            occupied.append((ent.start, ent.end))
+        i = bisect.bisect_right(ends, ent.start)
+        if i < len(starts) and starts[i] < ent.end:
+            continue
+        accepted.append(ent)
+        starts.insert(i, ent.start)
+        ends.insert(i, ent.end)
 
     return accepted
 
 
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  Redaction tokens
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def _placeholder_token(entity: PIIEntity, mapping: PIIMapping) -> str:
+    """Numbered placeholder such as ``[NAME_1]``."""
+    return mapping.add(entity.entity_type, entity.text)
+
+
+def _mask_token(entity: PIIEntity, mapping: PIIMapping) -> str:
+    """Asterisks, up to 20, in place of the value."""
+    # Still register in mapping for potential deanonymisation
+    mapping.add(entity.entity_type, entity.text)
+    return "*" * min(len(entity.text), 20)
+
+
+def _hash_token(entity: PIIEntity, mapping: PIIMapping) -> str:
+    """Type plus a 12-hex SHA-256 prefix, stable across sessions."""
+    h = hashlib.sha256(entity.text.encode()).hexdigest()[:12]
+    placeholder = f"[{entity.entity_type}:{h}]"
+    mapping.bind(placeholder, entity.text)
+    return placeholder
+
+
+# Strategy → token builder, looked up once per anonymise() call
+_TOKEN_BUILDERS: Dict[RedactStrategy, Callable[[PIIEntity, PIIMapping], str]] = {
+    RedactStrategy.PLACEHOLDER: _placeholder_token,
+    RedactStrategy.MASK: _mask_token,
+    RedactStrategy.HASH: _hash_token,
+}
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  Main service
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -878,12 +1140,17 @@ class PIIAnonymiser:
             and e.entity_type not in self.KEEP_TYPES
         ]
 
-        # Sort by start offset descending so replacements don't shift indices
+        # Sort by start offset descending; placeholders are numbered in this
+        # order, from the end of the text back
         entities.sort(key=lambda e: e.start, reverse=True)
 
         # ── Step 4: Replace with redaction tokens ──
+        # Merged spans never overlap, so the output is assembled back to
+        # front from untouched slices and tokens, then joined once.
+        make_token = _TOKEN_BUILDERS.get(effective_strategy, _placeholder_token)
         mapping = PIIMapping()
-        anon_text = text
+        parts: List[str] = []
+        tail_start = len(text)
         redact_count = 0
 
         for ent in entities:
@@ -891,14 +1158,14 @@ class PIIAnonymiser:
                 ent.entity_type in self.HIGH_RISK_TYPES
                 or ent.source == "comprehend"
             ):
-                token = self._make_token(
-                    ent, mapping, effective_strategy
-                )
-                anon_text = (
-                    anon_text[:ent.start] + token + anon_text[ent.end:]
-                )
+                parts.append(text[ent.end:tail_start])
+                parts.append(make_token(ent, mapping))
+                tail_start = ent.start
                 redact_count += 1
 
+        parts.append(text[:tail_start])
+        anon_text = "".join(reversed(parts))
+
         # ── Step 5: Audit ──
         detected_types = tuple(mapping.entity_counts.keys())
         sources = tuple(
@@ -935,31 +1202,6 @@ class PIIAnonymiser:
 
     # ── Private helpers ───────────────────────────────────────────────────
 
-    def _make_token(
-        self,
-        entity: PIIEntity,
-        mapping: PIIMapping,
-        strategy: RedactStrategy,
-    ) -> str:
-        """Generate the replacement token for a detected entity."""
-        if strategy == RedactStrategy.PLACEHOLDER:
-            return mapping.add(entity.entity_type, entity.text)
-
-        if strategy == RedactStrategy.MASK:
-            # Still register in mapping for potential deanonymisation
-            mapping.add(entity.entity_type, entity.text)
-            return "*" * min(len(entity.text), 20)
-
-        if strategy == RedactStrategy.HASH:
-            h = hashlib.sha256(entity.text.encode()).hexdigest()[:12]
-            placeholder = f"[{entity.entity_type}:{h}]"
-            mapping.placeholder_to_original[placeholder] = entity.text
-            mapping.original_to_placeholder[entity.text] = placeholder
-            return placeholder
-
-        # Fallback to placeholder
-        return mapping.add(entity.entity_type, entity.text)
-
     def _record_audit(
         self,
         text: str,
@@ -12,6 +12,7 @@ Pipeline:
             → generate a personalised summary with Bedrock Claude
 """
 
+import asyncio
 import hashlib
 import json
 import logging
@@ -19,10 +20,44 @@ import math
 import os
 import re
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+
+from app.services.session_store import scheme_cache
 
 logger = logging.getLogger(__name__)
 
+# Eligibility / response-parsing patterns (compiled once at import)
+_AGE_RANGE = re.compile(r"(\d+)\s*(?:to|-)\s*(\d+)")
+_AGE_ABOVE = re.compile(r"(?:above|over|>=?)\s*(\d+)")
+_AGE_BELOW = re.compile(r"(?:below|under|<=?)\s*(\d+)")
+_INCOME_NUM = re.compile(r"[\₹rs\.]*\s*([\d,]+)")
+_JSON_FENCED = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+# Map user income ranges to approximate numeric values (rupees/year)
+_INCOME_MIDPOINTS = {
+    "below-1l": 80_000,
+    "1l-3l": 200_000,
+    "3l-5l": 400_000,
+    "above-5l": 700_000,
+}
+_DEFAULT_INCOME = 200_000
+
+# Titan embedding request body is {"inputText": <json string>}; only the
+# string varies, so the envelope is spliced around orjson's encoding of it
+_EMBED_BODY_PREFIX = b'{"inputText":'
+
+# Only the highest-ranked schemes are written into the generation prompt;
+# the rest are still returned (see ``_merge_rag_with_schemes``).
+_PROMPT_SCHEME_LIMIT = 5
+
+# Sentinels for "no upper bound" in the per-scheme eligibility arrays
+_NO_AGE_LIMIT = int(np.iinfo(np.int16).max)
+_NO_INCOME_CAP = int(np.iinfo(np.int32).max)
+
 # ---------------------------------------------------------------------------
 #  AWS Bedrock Titan Embedding Index
 # ---------------------------------------------------------------------------
@@ -35,45 +70,42 @@ class BedrockEmbeddingIndex:
     - Persists embeddings to a local JSON cache so re-embedding is skipped
       when the knowledge-base hasn't changed.
     - Queries by embedding the search text and computing cosine similarity.
+    - Optionally partitions rows by a caller-supplied key per document so a
+      query can score only the partitions it could ever accept.
     """
 
     def __init__(self):
         self.embeddings: List[List[float]] = []   # one vector per doc
         self.doc_norms: List[float] = []
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._buckets: Dict[Hashable, np.ndarray] = {}
         self._built = False
         self._bedrock_runtime = None
         self._model_id: str = ""
 
     # ---- helpers ----
 
-    @staticmethod
-    def _cosine(a: List[float], b: List[float], b_norm: float) -> float:
-        dot = sum(x * y for x, y in zip(a, b))
-        a_norm = math.sqrt(sum(x * x for x in a)) or 1.0
-        return dot / (a_norm * b_norm) if b_norm else 0.0
-
     @staticmethod
     def _content_hash(documents: List[str]) -> str:
         """Deterministic hash of all document texts – used to invalidate the cache."""
-        h = hashlib.sha256()
-        for d in documents:
-            h.update(d.encode("utf-8"))
-        return h.hexdigest()[:16]
+        return hashlib.blake2b(
+            "".join(documents).encode("utf-8"), digest_size=8
+        ).hexdigest()
 
     # ---- embedding via Bedrock ----
 
     def _embed_text(self, text: str) -> List[float]:
         """Call Bedrock Titan Embeddings to get a single vector."""
-        body = json.dumps({
-            "inputText": text[:8000],  # Titan v2 supports up to 8K tokens
-        })
+        # Titan v2 supports up to 8K tokens
+        body = _EMBED_BODY_PREFIX + orjson.dumps(text[:8000]) + b"}"
         response = self._bedrock_runtime.invoke_model(
             modelId=self._model_id,
             contentType="application/json",
             accept="application/json",
             body=body,
         )
-        result = json.loads(response["body"].read().decode("utf-8"))
+        result = orjson.loads(response["body"].read())
         return result["embedding"]
 
     def _embed_batch(self, texts: List[str]) -> List[List[float]]:
@@ -94,10 +126,13 @@ class BedrockEmbeddingIndex:
         bedrock_runtime,
         model_id: str,
         cache_dir: Optional[str] = None,
+        partitions: Optional[Sequence[Hashable]] = None,
     ):
         """
         Embed all documents via Titan.  If a cache file with the same
         content-hash exists, load from disk instead of re-calling Bedrock.
+
+        ``partitions`` (one key per document) enables bucketed queries.
         """
         self._bedrock_runtime = bedrock_runtime
         self._model_id = model_id
@@ -114,7 +149,7 @@ class BedrockEmbeddingIndex:
                         cached = json.load(f)
                     self.embeddings = cached["embeddings"]
                     self.doc_norms = cached["doc_norms"]
-                    self._built = True
+                    self._finalise(partitions)
                     logger.info(
                         f"Loaded cached Titan embeddings ({len(self.embeddings)} docs) "
                         f"from {cache_path}"
@@ -130,7 +165,7 @@ class BedrockEmbeddingIndex:
             math.sqrt(sum(v * v for v in vec)) or 1.0
             for vec in self.embeddings
         ]
-        self._built = True
+        self._finalise(partitions)
 
         # Persist to cache
         if cache_path:
@@ -144,25 +179,55 @@ class BedrockEmbeddingIndex:
             except Exception as e:
                 logger.warning(f"Failed to write embedding cache: {e}")
 
+    def _finalise(self, partitions: Optional[Sequence[Hashable]]):
+        """Pack vectors into a matrix and group row indices by partition key."""
+        self._matrix = np.asarray(self.embeddings, dtype=np.float32)
+        self._norms = np.asarray(self.doc_norms, dtype=np.float32)
+        buckets: Dict[Hashable, List[int]] = {}
+        for idx, key in enumerate(partitions or ()):
+            buckets.setdefault(key, []).append(idx)
+        self._buckets = {
+            key: np.asarray(rows, dtype=np.intp) for key, rows in buckets.items()
+        }
+        self._built = True
+
     # ---- query ----
 
-    def query(self, text: str, top_k: int = 10) -> List[Tuple[int, float]]:
-        """Embed the query and return (doc_index, cosine_score) sorted descending."""
-        if not self._built:
+    def query(
+        self,
+        text: str,
+        top_k: int = 10,
+        partitions: Optional[Iterable[Hashable]] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Embed the query and return (doc_index, cosine_score) sorted descending.
+
+        When ``partitions`` is given, only documents in those buckets are scored.
+        """
+        if not self._built or not len(self._norms):
             return []
 
-        query_vec = self._embed_text(text)
+        query_vec = np.asarray(self._embed_text(text), dtype=np.float32)
+        q_norm = float(np.linalg.norm(query_vec)) or 1.0
 
-        scores: List[Tuple[int, float]] = []
-        for idx, (doc_vec, d_norm) in enumerate(
-            zip(self.embeddings, self.doc_norms)
-        ):
-            sim = self._cosine(query_vec, doc_vec, d_norm)
-            if sim > 0:
-                scores.append((idx, sim))
+        if partitions is not None and self._buckets:
+            rows = [self._buckets[k] for k in partitions if k in self._buckets]
+            if not rows:
+                return []
+            idxs = np.concatenate(rows)
+            sims = (self._matrix[idxs] @ query_vec) / (self._norms[idxs] * q_norm)
+        else:
+            idxs = np.arange(len(self._norms))
+            sims = (self._matrix @ query_vec) / (self._norms * q_norm)
 
-        scores.sort(key=lambda x: x[1], reverse=True)
-        return scores[:top_k]
+        # Top-k by quickselect over the positive scores; only k rows get sorted
+        positive = np.flatnonzero(sims > 0)
+        k = min(top_k, positive.size)
+        if k <= 0:
+            return []
+        top = positive[np.argpartition(-sims[positive], k - 1)[:k]]
+        top = top[np.argsort(-sims[top], kind="stable")]
+        return list(zip(idxs[top].tolist(), sims[top].tolist()))
 
 
 # ---------------------------------------------------------------------------
@@ -184,6 +249,18 @@ class SchemeRAGService:
         self._scheme_docs: List[str] = []    # one text blob per scheme
         self._initialised = False
 
+        # Per-scheme eligibility facts, parsed once at load (parallel arrays
+        # indexed like ``self._schemes``)
+        self._scheme_states = np.empty(0, dtype=object)
+        self._state_all_india = np.empty(0, dtype=bool)
+        self._age_lo = np.empty(0, dtype=np.int16)
+        self._age_hi = np.empty(0, dtype=np.int16)
+        self._income_cap = np.empty(0, dtype=np.int32)
+        self._bpl_required = np.empty(0, dtype=bool)
+
+        # Pre-rendered prompt text per scheme id (static fields only)
+        self._prompt_blobs: Dict[str, str] = {}
+
     @property
     def schemes(self) -> List[Dict[str, Any]]:
         """Public read-only access to loaded schemes."""
@@ -221,6 +298,10 @@ class SchemeRAGService:
 
         # Build a searchable text document per scheme
         self._scheme_docs = [self._scheme_to_text(s) for s in self._schemes]
+        self._build_eligibility_arrays()
+        self._prompt_blobs = {
+            s["id"]: self._scheme_prompt_blob(s) for s in self._schemes
+        }
 
         # Build Titan embedding index (with disk cache)
         cache_dir = str(
@@ -231,11 +312,39 @@ class SchemeRAGService:
             bedrock_runtime=aws_service.bedrock_runtime,
             model_id=settings.AWS_BEDROCK_EMBEDDING_MODEL_ID,
             cache_dir=cache_dir,
+            partitions=list(zip(self._scheme_states.tolist(), self._bpl_required.tolist())),
         )
 
         self._initialised = True
         logger.info(f"SchemeRAGService: loaded {len(self._schemes)} schemes (Titan embeddings)")
 
+    def _build_eligibility_arrays(self):
+        """Parse state / BPL / age / income criteria once per scheme."""
+        age_bounds = [
+            self._parse_age_bounds(s.get("age_criteria", "")) for s in self._schemes
+        ]
+        self._scheme_states = np.array(
+            [s.get("state", "all_india") for s in self._schemes], dtype=object
+        )
+        self._state_all_india = self._scheme_states == "all_india"
+        self._age_lo = np.array([lo for lo, _ in age_bounds], dtype=np.int16)
+        self._age_hi = np.array([hi for _, hi in age_bounds], dtype=np.int16)
+        self._income_cap = np.array(
+            [self._parse_income_cap(s) for s in self._schemes], dtype=np.int32
+        )
+        self._bpl_required = np.array(
+            [bool(s.get("bpl_required")) for s in self._schemes], dtype=bool
+        )
+
+    @staticmethod
+    def _candidate_partitions(state: str, is_bpl: bool) -> Optional[List[Tuple[str, bool]]]:
+        """(state, bpl_required) index buckets that can pass the hard filters."""
+        if not state:
+            return None  # no state filter → score every scheme
+        state_norm = state.lower().replace(" ", "_")
+        bpl_options = (False, True) if is_bpl else (False,)
+        return [(s, b) for s in (state_norm, "all_india") for b in bpl_options]
+
     @staticmethod
     def _scheme_to_text(scheme: Dict[str, Any]) -> str:
         """Flatten a scheme dict into a single searchable text."""
@@ -304,32 +413,43 @@ class SchemeRAGService:
             ]
 
         # TF-IDF retrieval
-        results = self._index.query(query, top_k=top_k * 2)  # over-retrieve for filtering
+        results = self._index.query(
+            query,
+            top_k=top_k * 2,  # over-retrieve for filtering
+            partitions=self._candidate_partitions(state, is_bpl),
+        )
 
-        # Post-retrieval hard filters
-        filtered: List[Dict[str, Any]] = []
-        state_norm = state.lower().replace(" ", "_") if state else ""
+        # Post-retrieval hard filters, evaluated as one boolean mask over the
+        # candidates against the eligibility arrays pre-parsed at load
+        if not results:
+            return []
+        idxs = np.fromiter((i for i, _ in results), dtype=np.intp, count=len(results))
+        scores = [score for _, score in results]
+        ok = np.ones(len(idxs), dtype=bool)
 
-        for doc_idx, score in results:
-            scheme = self._schemes[doc_idx]
+        # State filter: must be all_india or match user's state
+        if state:
+            state_norm = state.lower().replace(" ", "_")
+            ok &= self._state_all_india[idxs] | (self._scheme_states[idxs] == state_norm)
 
-            # State filter: must be all_india or match user's state
-            scheme_state = scheme.get("state", "all_india")
-            if state_norm and scheme_state != "all_india" and scheme_state != state_norm:
-                continue
+        # BPL filter: skip BPL-required schemes if user is not BPL
+        if not is_bpl:
+            ok &= ~self._bpl_required[idxs]
 
-            # BPL filter: skip BPL-required schemes if user is not BPL
-            if scheme.get("bpl_required") and not is_bpl:
-                continue
+        # Age filter
+        if age:
+            ok &= (self._age_lo[idxs] <= age) & (age <= self._age_hi[idxs])
 
-            # Age filter
-            age_criteria = scheme.get("age_criteria", "")
-            if age and not self._check_age_eligible(age, age_criteria):
-                continue
+        # Income filter
+        if income_range:
+            user_income = _INCOME_MIDPOINTS.get(income_range, _DEFAULT_INCOME)
+            ok &= user_income <= self._income_cap[idxs]
 
-            # Income filter
-            if not self._check_income_eligible(income_range, scheme):
-                continue
+        filtered: List[Dict[str, Any]] = []
+        for pos in np.flatnonzero(ok)[:top_k]:
+            doc_idx = int(idxs[pos])
+            score = scores[pos]
+            scheme = self._schemes[doc_idx]
 
             # Generate a specific match reason + structured factors
             match_reason = self._generate_match_reason(
@@ -346,9 +466,6 @@ class SchemeRAGService:
                 "match_factors": match_factors,
             })
 
-            if len(filtered) >= top_k:
-                break
-
         return filtered
 
     # ---- Bedrock-powered RAG generation ----
@@ -369,8 +486,16 @@ class SchemeRAGService:
         """
         from app.core.config import settings
 
-        # Step 1 – Retrieve
-        retrieved = self.retrieve(
+        # Identical profile + report + language → reuse the previous answer
+        cache_key = self._rag_cache_key(user_profile, medical_context, top_k)
+        cached = scheme_cache.get(cache_key, language)
+        if cached is not None:
+            logger.info("Returning cached scheme recommendations")
+            return cached
+
+        # Step 1 – Retrieve (embeds the query via Bedrock; keep it off the event loop)
+        retrieved = await asyncio.to_thread(
+            self.retrieve,
             state=user_profile.get("state", ""),
             income_range=user_profile.get("income_range", ""),
             age=user_profile.get("age", 0),
@@ -437,7 +562,8 @@ Respond in JSON format:
 }}"""
 
         try:
-            response = bedrock_runtime.converse(
+            response = await asyncio.to_thread(
+                bedrock_runtime.converse,
                 modelId=settings.AWS_BEDROCK_MODEL_ID,
                 messages=[{"role": "user", "content": [{"text": prompt}]}],
                 inferenceConfig={"maxTokens": 2048, "temperature": 0.3},
@@ -446,17 +572,21 @@ Respond in JSON format:
             text = response["output"]["message"]["content"][0]["text"]
 
             # Parse JSON from Claude's response
-            rag_result = self._parse_json_response(text)
+            rag_result, parsed = self._parse_json_response(text)
 
             # Merge RAG recommendations back into scheme data
             enriched = self._merge_rag_with_schemes(rag_result, retrieved)
 
-            return {
+            result = {
                 "schemes": enriched,
                 "summary": rag_result.get("summary", ""),
                 "count": len(enriched),
                 "rag_used": True,
             }
+            # An unparsed reply is served once but not replayed from cache
+            if parsed:
+                scheme_cache.set(cache_key, language, result)
+            return result
 
         except Exception as e:
             logger.warning(f"Bedrock RAG generation failed, returning retrieval-only: {e}")
@@ -472,6 +602,17 @@ Respond in JSON format:
 
     # ---- helpers ----
 
+    @staticmethod
+    def _rag_cache_key(
+        user_profile: Dict[str, Any], medical_context: str, top_k: int
+    ) -> str:
+        """Stable digest of everything that shapes a RAG response."""
+        payload = orjson.dumps(
+            {"p": user_profile, "m": medical_context, "k": top_k},
+            option=orjson.OPT_SORT_KEYS,
+        )
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
     @staticmethod
     def _extract_medical_keywords(text: str) -> str:
         """Pull out medically relevant terms from OCR text for better retrieval."""
@@ -500,62 +641,50 @@ Respond in JSON format:
         return " ".join(found)
 
     @staticmethod
-    def _check_age_eligible(user_age: int, age_criteria: str) -> bool:
-        """Check if user's age satisfies scheme's age criteria."""
+    def _parse_age_bounds(age_criteria: str) -> Tuple[int, int]:
+        """Parse a scheme's age criteria into an inclusive (lo, hi) range."""
         if not age_criteria or age_criteria.lower() in ("no restriction", "all ages", "no age limit", "no limit"):
-            return True
+            return 0, _NO_AGE_LIMIT
 
         # Parse ranges like "18 to 70 years", "60 years and above", "Above 19 years"
         criteria_lower = age_criteria.lower()
 
         # "X to Y years" pattern
-        m = re.search(r"(\d+)\s*(?:to|-)\s*(\d+)", criteria_lower)
+        m = _AGE_RANGE.search(criteria_lower)
         if m:
-            lo, hi = int(m.group(1)), int(m.group(2))
-            return lo <= user_age <= hi
+            return int(m.group(1)), int(m.group(2))
 
         # "above X" / "X years and above"
-        m = re.search(r"(?:above|over|>=?)\s*(\d+)", criteria_lower)
+        m = _AGE_ABOVE.search(criteria_lower)
         if m:
-            return user_age >= int(m.group(1))
+            return int(m.group(1)), _NO_AGE_LIMIT
 
         # "below X" / "under X"  / "0 to X"
-        m = re.search(r"(?:below|under|<=?)\s*(\d+)", criteria_lower)
+        m = _AGE_BELOW.search(criteria_lower)
         if m:
-            return user_age <= int(m.group(1))
+            return 0, int(m.group(1))
 
-        return True  # default pass
+        return 0, _NO_AGE_LIMIT  # default pass
 
     @staticmethod
-    def _check_income_eligible(income_range: str, scheme: Dict) -> bool:
-        """Basic income-range eligibility check."""
-        if not income_range:
-            return True
+    def _parse_income_cap(scheme: Dict) -> int:
+        """Parse a scheme's income criteria into a yearly cap (rupees)."""
         income_criteria = scheme.get("income_criteria", "")
         if not income_criteria or "none" in income_criteria.lower() or "universal" in income_criteria.lower():
-            return True
-
-        # Map user income ranges to approximate numeric values (rupees/year)
-        income_map = {
-            "below-1l": 80_000,
-            "1l-3l": 200_000,
-            "3l-5l": 400_000,
-            "above-5l": 700_000,
-        }
-        user_income = income_map.get(income_range, 200_000)
+            return _NO_INCOME_CAP
 
         # Extract numeric cap from criteria, e.g. "below ₹1,00,000" or "up to ₹72,000"
-        m = re.search(r"[\₹rs\.]*\s*([\d,]+)", income_criteria.replace(",", ""))
+        m = _INCOME_NUM.search(income_criteria.replace(",", ""))
         if m:
             cap_str = m.group(1).replace(",", "")
             try:
                 cap = int(cap_str)
-                if cap > 0 and user_income > cap:
-                    return False
+                if cap > 0:
+                    return min(cap, _NO_INCOME_CAP)
             except ValueError:
                 pass
 
-        return True
+        return _NO_INCOME_CAP
 
     @staticmethod
     def _generate_match_reason(
@@ -639,46 +768,58 @@ Respond in JSON format:
         return factors
 
     def _format_schemes_for_prompt(self, schemes: List[Dict]) -> str:
-        """Format retrieved schemes as text for the LLM prompt."""
+        """Format the top retrieved schemes as text for the LLM prompt."""
         parts = []
-        for i, s in enumerate(schemes, 1):
-            parts.append(
-                f"[{i}] {s['name']} (ID: {s['id']})\n"
-                f"   Type: {s.get('type','')}\n"
-                f"   Coverage: {s.get('coverage','')}\n"
-                f"   State: {s.get('state','all_india')}\n"
-                f"   Eligibility: {'; '.join(s.get('eligibility', []))}\n"
-                f"   Conditions Covered: {', '.join(s.get('conditions_covered', []))}\n"
-                f"   Documents Required: {', '.join(s.get('documents_required', []))}\n"
-                f"   Benefits: {'; '.join(s.get('benefits', []))}\n"
-                f"   Helpline: {s.get('helpline', 'N/A')}\n"
-                f"   Description: {s.get('description','')}\n"
-            )
+        for i, s in enumerate(schemes[:_PROMPT_SCHEME_LIMIT], 1):
+            blob = self._prompt_blobs.get(s["id"])
+            if blob is None:
+                blob = self._scheme_prompt_blob(s)
+            parts.append(f"[{i}] {blob}")
         return "\n".join(parts)
 
     @staticmethod
-    def _parse_json_response(text: str) -> Dict:
-        """Robustly extract JSON from Claude's response."""
+    def _scheme_prompt_blob(s: Dict) -> str:
+        """Render one scheme's static fields for the LLM prompt."""
+        return (
+            f"{s['name']} (ID: {s['id']})\n"
+            f"   Type: {s.get('type','')}\n"
+            f"   Coverage: {s.get('coverage','')}\n"
+            f"   State: {s.get('state','all_india')}\n"
+            f"   Eligibility: {'; '.join(s.get('eligibility', []))}\n"
+            f"   Conditions Covered: {', '.join(s.get('conditions_covered', []))}\n"
+            f"   Documents Required: {', '.join(s.get('documents_required', []))}\n"
+            f"   Benefits: {'; '.join(s.get('benefits', []))}\n"
+            f"   Helpline: {s.get('helpline', 'N/A')}\n"
+            f"   Description: {s.get('description','')}\n"
+        )
+
+    @staticmethod
+    def _parse_json_response(text: str) -> Tuple[Dict, bool]:
+        """Robustly extract JSON from Claude's response.
+
+        Returns the result and whether JSON was actually parsed; False means
+        the raw text was wrapped as the summary.
+        """
         # Try direct parse
         try:
-            return json.loads(text)
-        except json.JSONDecodeError:
+            return orjson.loads(text), True
+        except orjson.JSONDecodeError:
             pass
         # Try extracting ```json ... ```
-        m = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", text, re.DOTALL)
+        m = _JSON_FENCED.search(text)
         if m:
             try:
-                return json.loads(m.group(1))
-            except json.JSONDecodeError:
+                return orjson.loads(m.group(1)), True
+            except orjson.JSONDecodeError:
                 pass
         # Try finding any { ... } block
-        m = re.search(r"\{.*\}", text, re.DOTALL)
+        m = _JSON_OBJECT.search(text)
         if m:
             try:
-                return json.loads(m.group(0))
-            except json.JSONDecodeError:
+                return orjson.loads(m.group(0)), True
+            except orjson.JSONDecodeError:
                 pass
-        return {"summary": text, "recommendations": []}
+        return {"summary": text, "recommendations": []}, False
 
     def _merge_rag_with_schemes(
         self, rag_result: Dict, retrieved: List[Dict]
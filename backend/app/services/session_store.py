@@ -5,10 +5,10 @@ Shared across endpoints to maintain session state.
 
 import logging
 import time
-import hashlib
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from collections import OrderedDict
+from dataclasses import dataclass
 import threading
 
 logger = logging.getLogger(__name__)
@@ -17,29 +17,48 @@ logger = logging.getLogger(__name__)
 class SessionStore:
     """Thread-safe in-memory session store with TTL and cache."""
 
+    SWEEP_EVERY = 256  # writes between full expiry sweeps
+
     def __init__(self, max_sessions: int = 1000, ttl_minutes: int = 30):
         self._store: OrderedDict[str, Dict[str, Any]] = OrderedDict()
         self._lock = threading.Lock()
         self._max_sessions = max_sessions
         self._ttl = timedelta(minutes=ttl_minutes)
+        self._writes_since_sweep = 0
 
     def create(self, session_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
         with self._lock:
-            self._cleanup_expired()
-            if len(self._store) >= self._max_sessions:
-                # Remove oldest
-                self._store.popitem(last=False)
-            data["created_at"] = datetime.now()
-            data["updated_at"] = datetime.now()
+            # One clock read serves both expiry cutoffs and the timestamps
+            now = datetime.now()
+            cutoff = now - self._ttl
+            self._cleanup_expired(cutoff)
+            self._count_write(cutoff)
+            if session_id in self._store:
+                # Re-created: drop the old entry so the new one lands at the
+                # MRU end instead of keeping its old slot
+                del self._store[session_id]
+            elif len(self._store) >= self._max_sessions:
+                # Expired sessions can sit behind a live head (see
+                # _count_write); purge them all before evicting a live one
+                self._purge_expired(cutoff)
+                if len(self._store) >= self._max_sessions:
+                    # Remove oldest
+                    self._store.popitem(last=False)
+            data["created_at"] = now
+            data["updated_at"] = now
             self._store[session_id] = data
             return data
 
     def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        # Unknown ids are answered without the lock (a single membership test
+        # is atomic); hits still lock, as expiry and the LRU move both mutate
+        if session_id not in self._store:
+            return None
         with self._lock:
             session = self._store.get(session_id)
             if session:
                 # Check if expired
-                if datetime.now() - session["updated_at"] > self._ttl:
+                if session["updated_at"] < datetime.now() - self._ttl:
                     del self._store[session_id]
                     return None
                 # Move to end (LRU)
@@ -49,8 +68,10 @@ class SessionStore:
     def update(self, session_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         with self._lock:
             if session_id in self._store:
+                now = datetime.now()
+                self._count_write(now - self._ttl)
                 self._store[session_id].update(data)
-                self._store[session_id]["updated_at"] = datetime.now()
+                self._store[session_id]["updated_at"] = now
                 self._store.move_to_end(session_id)
                 return self._store[session_id]
             return None
@@ -62,52 +83,86 @@ class SessionStore:
                 return True
             return False
 
-    def _cleanup_expired(self):
-        """Remove expired sessions."""
-        now = datetime.now()
+    def _cleanup_expired(self, cutoff: datetime):
+        """Remove expired sessions from the LRU head.
+
+        Sessions are kept in least-recently-used order, so stale entries
+        collect at the front; stop at the first live one instead of
+        walking the whole store on every create.
+        """
+        while self._store:
+            updated_at = next(iter(self._store.values())).get("updated_at")
+            if updated_at is None or updated_at >= cutoff:
+                break
+            self._store.popitem(last=False)
+
+    def _count_write(self, cutoff: datetime):
+        """Every SWEEP_EVERY writes, purge expired sessions anywhere in the store.
+
+        A session read via get() moves to the MRU end without refreshing its
+        updated_at, so it can expire behind a live head that
+        _cleanup_expired stops at. Lazy checks in get() keep reads correct;
+        this bounds how long such entries hold memory, at amortised O(1)
+        per write.
+        """
+        self._writes_since_sweep += 1
+        if self._writes_since_sweep < self.SWEEP_EVERY:
+            return
+        self._writes_since_sweep = 0
+        self._purge_expired(cutoff)
+
+    def _purge_expired(self, cutoff: datetime):
+        """Remove every expired session, wherever it sits in the LRU order."""
         expired = [
             sid for sid, data in self._store.items()
-            if now - data.get("updated_at", now) > self._ttl
+            if data.get("updated_at") is not None and data["updated_at"] < cutoff
         ]
         for sid in expired:
             del self._store[sid]
 
 
+@dataclass(slots=True)
+class _CacheEntry:
+    """One cached response and when it expires (time.monotonic())."""
+    data: Dict[str, Any]
+    expires_at: float
+
+
 class QueryCache:
     """Simple LRU cache for repeated queries."""
 
     def __init__(self, max_entries: int = 500, ttl_seconds: int = 3600):
-        self._cache: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._cache: OrderedDict[Tuple[str, str], _CacheEntry] = OrderedDict()
         self._lock = threading.Lock()
         self._max_entries = max_entries
         self._ttl = ttl_seconds
 
     @staticmethod
-    def _make_key(text: str, language: str) -> str:
-        content = f"{text[:500]}:{language}"
-        return hashlib.sha256(content.encode()).hexdigest()
+    def _make_key(text: str, language: str) -> Tuple[str, str]:
+        # The strings themselves: str caches its hash, so no encode or digest
+        # pass over the text per lookup. Keyed on the first 500 chars, as before.
+        return (language, text[:500])
 
     def get(self, text: str, language: str) -> Optional[Dict[str, Any]]:
         key = self._make_key(text, language)
         with self._lock:
             entry = self._cache.get(key)
             if entry:
-                if time.time() - entry["timestamp"] > self._ttl:
+                if time.monotonic() > entry.expires_at:
                     del self._cache[key]
                     return None
                 self._cache.move_to_end(key)
-                return entry["data"]
+                return entry.data
             return None
 
     def set(self, text: str, language: str, data: Dict[str, Any]):
         key = self._make_key(text, language)
         with self._lock:
-            if len(self._cache) >= self._max_entries:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+            elif len(self._cache) >= self._max_entries:
                 self._cache.popitem(last=False)
-            self._cache[key] = {
-                "data": data,
-                "timestamp": time.time(),
-            }
+            self._cache[key] = _CacheEntry(data, time.monotonic() + self._ttl)
 
     def invalidate(self, text: str, language: str):
         key = self._make_key(text, language)
@@ -119,3 +174,4 @@ class QueryCache:
 sessions_store = SessionStore()
 analysis_cache = QueryCache(max_entries=200, ttl_seconds=1800)
 audio_cache = QueryCache(max_entries=100, ttl_seconds=3600)
+scheme_cache = QueryCache(max_entries=200, ttl_seconds=1800)
@@ -4,16 +4,68 @@ Sends medical report summaries and government scheme info to patient's phone.
 Cost: ~₹0.80 per SMS in India (~$0.01 USD).
 """
 
+import asyncio
+import io
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 logger = logging.getLogger(__name__)
 
+# Bullet line formatters (bound str.format, built once; include the newline)
+_BULLET = "  • {}\n".format
+_ALERT_LINE = "  • {}: {}\n".format
+_ABNORMAL_LINE = "  • {}: {} ({})\n".format
+_SCHEME_LINE = "  • {} - {}\n".format
+_HELPLINE_LINE = "    Helpline: {}\n".format
+_EMERGENCY_NUMBERS = "  Ambulance: 108 | Emergency: 112\n"
+
 
 class SMSService:
     """Send report summaries and scheme info via SMS using AWS SNS."""
 
     MAX_SMS_LENGTH = 1600  # Multi-part SMS (10 segments × 160 chars)
+    BATCH_SIZE = 10  # Concurrent SNS publishes per batch round
+
+    # Fixed SMS text per language
+    _TEMPLATES = {
+        "en": {
+            "header": "AccessAI - Your Medical Report Summary\n",
+            "urgent": "URGENT ATTENTION:",
+            "abnormal": "Abnormal Values:",
+            "ask": "Ask your doctor:",
+            "schemes": "Eligible Govt Schemes:",
+            "footer": "Please visit a doctor. AccessAI does not diagnose.",
+        },
+        "hi": {
+            "header": "AccessAI - आपकी मेडिकल रिपोर्ट सारांश\n",
+            "urgent": "तत्काल ध्यान दें:",
+            "abnormal": "असामान्य मान:",
+            "ask": "डॉक्टर से पूछें:",
+            "schemes": "योग्य सरकारी योजनाएं:",
+            "footer": "कृपया डॉक्टर से मिलें। AccessAI निदान नहीं देता।",
+        },
+        "kn": {
+            "header": "AccessAI - ನಿಮ್ಮ ವೈದ್ಯಕೀಯ ವರದಿ ಸಾರಾಂಶ\n",
+            "urgent": "ತುರ್ತು ಗಮನ:",
+            "abnormal": "ಅಸಹಜ ಮೌಲ್ಯಗಳು:",
+            "ask": "ವೈದ್ಯರನ್ನು ಕೇಳಿ:",
+            "schemes": "ಅರ್ಹ ಸರ್ಕಾರಿ ಯೋಜನೆಗಳು:",
+            "footer": "ದಯವಿಟ್ಟು ವೈದ್ಯರನ್ನು ಭೇಟಿ ಮಾಡಿ. AccessAI ರೋಗನಿರ್ಣಯ ಮಾಡುವುದಿಲ್ಲ.",
+        },
+    }
+
+    # Sent with every message; never mutated (kept a plain dict: botocore's
+    # parameter validation rejects read-only mapping proxies)
+    _SMS_ATTRS = {
+        "AWS.SNS.SMS.SenderID": {
+            "DataType": "String",
+            "StringValue": "AccessAI",
+        },
+        "AWS.SNS.SMS.SMSType": {
+            "DataType": "String",
+            "StringValue": "Transactional",
+        },
+    }
 
     def __init__(self):
         self.sns_client = None
@@ -30,87 +82,92 @@ class SMSService:
         schemes: Optional[Dict] = None,
     ) -> str:
         """Format analysis results into a concise SMS message."""
-        
-        # Header
-        if language == "hi":
-            lines = ["AccessAI - आपकी मेडिकल रिपोर्ट सारांश\n"]
-        elif language == "kn":
-            lines = ["AccessAI - ನಿಮ್ಮ ವೈದ್ಯಕೀಯ ವರದಿ ಸಾರಾಂಶ\n"]
-        else:
-            lines = ["AccessAI - Your Medical Report Summary\n"]
+        t = self._TEMPLATES.get(language, self._TEMPLATES["en"])
+        footer = t["footer"]
+        # Room left for everything above the footer, which is always kept
+        budget = self.MAX_SMS_LENGTH - len(footer)
+        buf = io.StringIO()
+
+        buf.write(t["header"])
+        buf.write("\n")
+        self._emit_summary(buf, analysis)
+
+        for emit in (self._emit_emergency, self._emit_abnormals, self._emit_questions):
+            if buf.tell() >= budget:
+                break
+            emit(buf, analysis, t)
 
-        # Summary (truncated to fit SMS)
+        if include_schemes and schemes and buf.tell() < budget:
+            self._emit_schemes(buf, schemes, t)
+
+        return buf.getvalue()[:budget] + footer
+
+    # ---- message sections ----
+
+    @staticmethod
+    def _emit_summary(buf: io.StringIO, analysis: Dict[str, Any]):
+        """Summary (truncated to fit SMS)."""
         summary = analysis.get("summary", "")
         if summary:
-            lines.append(summary[:300])
-            lines.append("")
+            buf.write(summary[:300])
+            buf.write("\n\n")
 
-        # Critical alerts (always included)
+    @staticmethod
+    def _emit_emergency(buf: io.StringIO, analysis: Dict[str, Any], t: Dict[str, str]):
+        """Critical alerts (always included)."""
         emergency = analysis.get("emergency", {})
-        if emergency and emergency.get("has_emergency"):
-            if language == "hi":
-                lines.append("तत्काल ध्यान दें:")
-            elif language == "kn":
-                lines.append("ತುರ್ತು ಗಮನ:")
-            else:
-                lines.append("URGENT ATTENTION:")
-            for alert in emergency.get("alerts", [])[:3]:
-                lines.append(f"  • {alert.get('test_name', '')}: {alert.get('message', '')}")
-            lines.append(f"  Ambulance: 108 | Emergency: 112")
-            lines.append("")
-
-        # Abnormal values (top 5)
-        abnormals = analysis.get("abnormal_values", [])
-        if abnormals:
-            if language == "hi":
-                lines.append("असामान्य मान:")
-            elif language == "kn":
-                lines.append("ಅಸಹಜ ಮೌಲ್ಯಗಳು:")
-            else:
-                lines.append("Abnormal Values:")
-            for av in abnormals[:5]:
-                lines.append(f"  • {av.get('test_name', '')}: {av.get('value', '')} ({av.get('severity', '')})")
-            lines.append("")
-
-        # Doctor questions (top 3)
-        questions = analysis.get("questions_for_doctor", [])
-        if questions:
-            if language == "hi":
-                lines.append("डॉक्टर से पूछें:")
-            elif language == "kn":
-                lines.append("ವೈದ್ಯರನ್ನು ಕೇಳಿ:")
-            else:
-                lines.append("Ask your doctor:")
-            for q in questions[:3]:
-                lines.append(f"  • {q}")
-            lines.append("")
-
-        # Schemes (if requested)
-        if include_schemes and schemes:
-            scheme_list = schemes.get("schemes", [])
-            if scheme_list:
-                if language == "hi":
-                    lines.append("योग्य सरकारी योजनाएं:")
-                elif language == "kn":
-                    lines.append("ಅರ್ಹ ಸರ್ಕಾರಿ ಯೋಜನೆಗಳು:")
-                else:
-                    lines.append("Eligible Govt Schemes:")
-                for s in scheme_list[:3]:
-                    lines.append(f"  • {s.get('name', '')} - {s.get('coverage', '')}")
-                    if s.get("helpline"):
-                        lines.append(f"    Helpline: {s['helpline']}")
-                lines.append("")
-
-        # Footer
-        if language == "hi":
-            lines.append("कृपया डॉक्टर से मिलें। AccessAI निदान नहीं देता।")
-        elif language == "kn":
-            lines.append("ದಯವಿಟ್ಟು ವೈದ್ಯರನ್ನು ಭೇಟಿ ಮಾಡಿ. AccessAI ರೋಗನಿರ್ಣಯ ಮಾಡುವುದಿಲ್ಲ.")
-        else:
-            lines.append("Please visit a doctor. AccessAI does not diagnose.")
+        if not (emergency and emergency.get("has_emergency")):
+            return
+        top_alerts = emergency.get("alerts", [])[:3]
+        buf.write(t["urgent"])
+        buf.write("\n")
+        buf.write("".join(
+            _ALERT_LINE(a.get("test_name", ""), a.get("message", "")) for a in top_alerts
+        ))
+        buf.write(_EMERGENCY_NUMBERS)
+        buf.write("\n")
+
+    @staticmethod
+    def _emit_abnormals(buf: io.StringIO, analysis: Dict[str, Any], t: Dict[str, str]):
+        """Abnormal values (top 5)."""
+        top_abnormals = (analysis.get("abnormal_values") or [])[:5]
+        if not top_abnormals:
+            return
+        buf.write(t["abnormal"])
+        buf.write("\n")
+        buf.write("".join(
+            _ABNORMAL_LINE(av.get("test_name", ""), av.get("value", ""), av.get("severity", ""))
+            for av in top_abnormals
+        ))
+        buf.write("\n")
+
+    @staticmethod
+    def _emit_questions(buf: io.StringIO, analysis: Dict[str, Any], t: Dict[str, str]):
+        """Doctor questions (top 3)."""
+        top_questions = (analysis.get("questions_for_doctor") or [])[:3]
+        if not top_questions:
+            return
+        buf.write(t["ask"])
+        buf.write("\n")
+        buf.write("".join(_BULLET(q) for q in top_questions))
+        buf.write("\n")
+
+    @staticmethod
+    def _emit_schemes(buf: io.StringIO, schemes: Dict, t: Dict[str, str]):
+        """Eligible schemes (top 3) with helplines."""
+        top_schemes = (schemes.get("schemes") or [])[:3]
+        if not top_schemes:
+            return
+        buf.write(t["schemes"])
+        buf.write("\n")
+        buf.write("".join(
+            _SCHEME_LINE(s.get("name", ""), s.get("coverage", ""))
+            + (_HELPLINE_LINE(s["helpline"]) if s.get("helpline") else "")
+            for s in top_schemes
+        ))
+        buf.write("\n")
 
-        message = "\n".join(lines)
-        return message[:self.MAX_SMS_LENGTH]
+    # ---- sending ----
 
     async def send_summary(
         self,
@@ -125,28 +182,82 @@ class SMSService:
         if not self.sns_client:
             raise RuntimeError("SMS service not initialized. Missing SNS client.")
 
-        # Validate Indian phone number
-        if not phone_number.startswith("+91") or len(phone_number) != 13:
-            raise ValueError("Invalid phone number. Must be +91XXXXXXXXXX format.")
+        self._validate_phone(phone_number)
 
         message = self._format_summary_sms(
             analysis, language, include_schemes, schemes
         )
+        # boto3 is blocking; keep the SNS round-trip off the event loop
+        return await asyncio.to_thread(self._publish, phone_number, message)
+
+    async def send_summary_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Send summary SMS to many recipients.
+
+        Each item carries the ``send_summary`` keyword arguments. Results are
+        returned in input order; an invalid number fails only its own entry.
+        Items sharing the same analysis (and language / schemes) object are
+        formatted once per call.
+        """
+        if not self.sns_client:
+            raise RuntimeError("SMS service not initialized. Missing SNS client.")
+
+        # (id(analysis), language, include_schemes, id(schemes)) ->
+        # (analysis, schemes, message); holding the objects keeps their ids
+        # from being reused while the batch runs
+        bodies: Dict[tuple, tuple] = {}
+        results: List[Dict[str, Any]] = []
+        for start in range(0, len(items), self.BATCH_SIZE):
+            chunk = items[start:start + self.BATCH_SIZE]
+            results.extend(await asyncio.gather(
+                *(self._send_item(item, bodies) for item in chunk)
+            ))
+        return results
+
+    async def _send_item(self, item: Dict[str, Any], bodies: Dict[tuple, tuple]) -> Dict[str, Any]:
+        """Validate and format one batch entry on the loop, then publish it in a thread."""
+        phone_number = item.get("phone_number", "")
+        try:
+            self._validate_phone(phone_number)
+        except ValueError as e:
+            return {"success": False, "message_id": None, "message": str(e)}
+
+        analysis = item.get("analysis", {})
+        language = item.get("language", "en")
+        include_schemes = item.get("include_schemes", False)
+        schemes = item.get("schemes")
+        key = (id(analysis), language, include_schemes, id(schemes))
+        cached = bodies.get(key)
+        if cached is None:
+            message = self._format_summary_sms(analysis, language, include_schemes, schemes)
+            bodies[key] = (analysis, schemes, message)
+        else:
+            message = cached[2]
+        return await asyncio.to_thread(self._publish, phone_number, message)
+
+    @staticmethod
+    def _validate_phone(phone_number: str):
+        """Validate Indian phone number (E.164: +91 and ten ASCII digits)."""
+        if not isinstance(phone_number, str):
+            # Batch items are plain dicts; a missing/None number must fail
+            # its own entry rather than raise TypeError out of the gather
+            raise ValueError("Invalid phone number. Must be +91XXXXXXXXXX format.")
+        digits = phone_number[3:]
+        if not (
+            len(phone_number) == 13
+            and phone_number.startswith("+91")
+            and digits.isascii()
+            and digits.isdigit()
+        ):
+            raise ValueError("Invalid phone number. Must be +91XXXXXXXXXX format.")
 
+    def _publish(self, phone_number: str, message: str) -> Dict[str, Any]:
+        """Publish one SMS via SNS and wrap the outcome."""
         try:
             response = self.sns_client.publish(
                 PhoneNumber=phone_number,
                 Message=message,
-                MessageAttributes={
-                    "AWS.SNS.SMS.SenderID": {
-                        "DataType": "String",
-                        "StringValue": "AccessAI",
-                    },
-                    "AWS.SNS.SMS.SMSType": {
-                        "DataType": "String",
-                        "StringValue": "Transactional",
-                    },
-                },
+                MessageAttributes=self._SMS_ATTRS,
             )
 
             message_id = response.get("MessageId", "")
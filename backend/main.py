@@ -1,5 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 import logging
 
@@ -36,16 +38,20 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs" if config.settings.ENVIRONMENT != "production" else None,
     redoc_url="/redoc" if config.settings.ENVIRONMENT != "production" else None,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan,
 )
 
-# Configure CORS
+# Compress larger JSON payloads (analysis / scheme results) for mobile clients
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+# Configure CORS (explicit lists: only what the frontend actually sends)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=config.settings.CORS_ORIGINS,
+    allow_origins=frozenset(config.settings.CORS_ORIGINS),
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "DELETE", "OPTIONS"],
+    allow_headers=["Content-Type"],
 )
 
 # Include routers
@@ -94,3 +100,18 @@ async def health_check():
         "status": "healthy",
         "environment": config.settings.ENVIRONMENT
     }
+
+
+if __name__ == "__main__":
+    import sys
+
+    import uvicorn
+
+    # uvloop + httptools come with uvicorn[standard]; uvloop has no Windows build
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+    )
@@ -1,19 +1,30 @@
 """
 Shared pytest fixtures for AccessAI backend tests.
+
+``sample_analysis_result`` returns the shared SAMPLE_ANALYSIS_RESULT and must
+be treated as read-only; tests that modify an analysis result should request
+``mutable_analysis_result`` (a deep copy) instead.
 """
 
+import copy
 import sys
 import os
+import orjson
 import pytest
 from unittest.mock import MagicMock, AsyncMock, patch
 from datetime import datetime
 
+from fastapi.testclient import TestClient
+
 # Ensure backend is on the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 
 # ── Sample data ──────────────────────────────────────────────
 
+# Fixed timestamp for session fixtures (deterministic across runs)
+_FIXED_TS = datetime(2025, 1, 15, 12, 0, 0)
+
 SAMPLE_MEDICAL_TEXT = """
 PATHOLOGY LAB REPORT
 Patient Name: Rajesh Kumar
@@ -131,25 +142,68 @@ def sample_normal_text():
 
 @pytest.fixture
 def sample_analysis_result():
-    return SAMPLE_ANALYSIS_RESULT.copy()
+    return SAMPLE_ANALYSIS_RESULT
 
 
 @pytest.fixture
-def mock_bedrock_runtime():
-    """Mock Bedrock Runtime client returning a valid analysis JSON."""
-    import json
+def mutable_analysis_result():
+    return copy.deepcopy(SAMPLE_ANALYSIS_RESULT)
 
-    mock = MagicMock()
-    response_body = json.dumps(
-        {"content": [{"text": json.dumps(SAMPLE_ANALYSIS_RESULT)}]}
-    ).encode("utf-8")
 
-    mock_stream = MagicMock()
-    mock_stream.read.return_value = response_body
-    mock.invoke_model.return_value = {"body": mock_stream}
+@pytest.fixture(scope="session")
+def analysis_service():
+    """One MedicalAnalysisService for the pure helper tests (prompt, parsing, scoring).
+
+    analyze() caches replies per instance, so tests of it build their own.
+    """
+    from app.services.medical_analysis import MedicalAnalysisService
+
+    return MedicalAnalysisService()
+
+
+@pytest.fixture(scope="session")
+def mock_bedrock_runtime():
+    """Mock Bedrock Runtime client returning a valid analysis JSON (read-only; shared)."""
+    mock = MagicMock()
+    mock.converse.return_value = {
+        "output": {"message": {"content": [{"text": orjson.dumps(SAMPLE_ANALYSIS_RESULT).decode()}]}}
+    }
     return mock
 
 
+_AWS_CLIENTS = (
+    "bedrock_runtime",
+    "textract_client",
+    "polly_client",
+    "comprehend_client",
+    "sns_client",
+    "s3_client",
+)
+
+
+@pytest.fixture(scope="module")
+def mocked_aws():
+    """Patched aws_service with a MagicMock per boto3 client, shared within a module.
+
+    Module scope stops the patch once the requesting module finishes, so
+    later modules that import aws_service lazily see the real object.
+    """
+    with patch("app.services.aws_service.aws_service") as mock_aws:
+        mock_aws._initialized = True
+        for name in _AWS_CLIENTS:
+            setattr(mock_aws, name, MagicMock())
+        yield mock_aws
+
+
+@pytest.fixture(scope="module")
+def client(mocked_aws):
+    """Test client for the FastAPI app (built once per module)."""
+    # AWS services must be mocked before the app is imported
+    from main import app
+
+    return TestClient(app)
+
+
 @pytest.fixture
 def mock_sns_client():
     """Mock SNS client."""
@@ -182,7 +236,7 @@ def mock_comprehend_client():
 
 
 @pytest.fixture
-def mock_session_with_analysis():
+def mock_session_with_analysis(mutable_analysis_result):
     """A session dict that already has OCR + analysis results."""
     return {
         "session_id": "test-session-123",
@@ -195,7 +249,7 @@ def mock_session_with_analysis():
             "key_value_pairs": [],
             "tables": [],
         },
-        "analysis_result": SAMPLE_ANALYSIS_RESULT.copy(),
-        "created_at": datetime.now(),
-        "updated_at": datetime.now(),
+        "analysis_result": mutable_analysis_result,
+        "created_at": _FIXED_TS,
+        "updated_at": _FIXED_TS,
     }
@@ -10,8 +10,10 @@ from app.services.emergency_detector import EmergencyDetector, emergency_detecto
 class TestEmergencyDetector:
     """Unit tests for EmergencyDetector."""
 
-    def setup_method(self):
-        self.detector = EmergencyDetector()
+    @classmethod
+    def setup_class(cls):
+        # EmergencyDetector holds no per-call state; one instance serves the class
+        cls.detector = EmergencyDetector()
 
     # ── Detect nothing when values are normal ──
 
@@ -130,6 +132,11 @@ class TestEmergencyDetector:
         result = self.detector.detect_critical_values("")
         assert result["has_emergency"] is False
 
+    def test_text_without_digits(self):
+        result = self.detector.detect_critical_values("Glucose: very high, potassium low")
+        assert result["has_emergency"] is False
+        assert result["alerts"] == []
+
     def test_non_numeric_value_in_finding(self):
         findings = [
             {"test_name": "Glucose", "value": "N/A", "status": "high"},
@@ -181,8 +188,9 @@ class TestEmergencyDetector:
 class TestExtractNumeric:
     """Tests for the _extract_numeric helper."""
 
-    def setup_method(self):
-        self.detector = EmergencyDetector()
+    @classmethod
+    def setup_class(cls):
+        cls.detector = EmergencyDetector()
 
     def test_integer(self):
         assert self.detector._extract_numeric("45") == 45.0
@@ -4,6 +4,8 @@ Covers: prompt building, response parsing, confidence calculation, local abnorma
 """
 
 import json
+import re
+import threading
 import pytest
 from unittest.mock import MagicMock, patch
 
@@ -11,181 +13,279 @@ from app.services.medical_analysis import MedicalAnalysisService, medical_analys
 
 
 class TestPromptBuilding:
-    """Tests for prompt construction."""
+    """Tests for the Converse request built for an analysis, with and without prompt caching."""
 
-    def setup_method(self):
-        self.service = MedicalAnalysisService()
+    @pytest.fixture(params=[False, True], ids=["uncached", "cached"])
+    def build(self, request, analysis_service):
+        """Build a request and return all of its prompt text, system blocks included."""
+
+        def _build(text, language, key_value_pairs=None, tables=None):
+            tail = analysis_service._dynamic_tail(text, key_value_pairs, tables)
+            with patch("app.services.medical_analysis.settings.BEDROCK_PROMPT_CACHING", request.param):
+                req = analysis_service._converse_request(tail, language)
+            blocks = req.get("system", []) + req["messages"][0]["content"]
+            return "".join(block.get("text", "") for block in blocks)
 
-    def test_english_prompt(self):
-        prompt = self.service._build_structured_prompt("Some text", "en")
+        return _build
+
+    def test_english_prompt(self, build):
+        prompt = build("Some text", "en")
         assert "Respond in English" in prompt
         assert "AccessAI" in prompt
         assert "Some text" in prompt
         assert "valid JSON" in prompt
 
-    def test_hindi_prompt(self):
-        prompt = self.service._build_structured_prompt("Some text", "hi")
+    def test_hindi_prompt(self, build):
+        prompt = build("Some text", "hi")
         assert "Hindi" in prompt
         assert "हिंदी" in prompt
 
-    def test_kannada_prompt(self):
-        prompt = self.service._build_structured_prompt("Some text", "kn")
+    def test_kannada_prompt(self, build):
+        prompt = build("Some text", "kn")
         assert "Kannada" in prompt
         assert "ಕನ್ನಡ" in prompt
 
-    def test_prompt_includes_key_value_pairs(self):
+    def test_prompt_includes_key_value_pairs(self, build):
         kvs = [{"key": "Hemoglobin", "value": "15 g/dL"}]
-        prompt = self.service._build_structured_prompt("text", "en", key_value_pairs=kvs)
+        prompt = build("text", "en", key_value_pairs=kvs)
         assert "Hemoglobin" in prompt
         assert "15 g/dL" in prompt
         assert "KEY-VALUE PAIRS" in prompt
 
-    def test_prompt_includes_tables(self):
+    def test_prompt_includes_tables(self, build):
         tables = [[["Test", "Value"], ["Hb", "15"]]]
-        prompt = self.service._build_structured_prompt("text", "en", tables=tables)
+        prompt = build("text", "en", tables=tables)
         assert "TABLE 1" in prompt
         assert "Hb" in prompt
 
-    def test_prompt_safety_guidelines(self):
-        prompt = self.service._build_structured_prompt("text", "en")
+    def test_prompt_safety_guidelines(self, build):
+        prompt = build("text", "en")
         assert "NEVER provide a diagnosis" in prompt
         assert "uncertainty" in prompt.lower()
         assert "consulting a doctor" in prompt.lower()
 
-    def test_prompt_requests_json_format(self):
-        prompt = self.service._build_structured_prompt("text", "en")
+    def test_prompt_requests_json_format(self, build):
+        prompt = build("text", "en")
         assert '"summary"' in prompt
         assert '"key_findings"' in prompt
         assert '"abnormal_values"' in prompt
         assert '"questions_for_doctor"' in prompt
 
+    def test_unknown_language_falls_back_to_english(self, build):
+        prompt = build("Some text", "ta")
+        assert "Respond in English" in prompt
+
+    def test_static_header_cached(self):
+        assert MedicalAnalysisService._static_header("en") is MedicalAnalysisService._static_header("en")
+
+    def test_static_header_comes_first(self, build):
+        prompt = build("Some text", "hi")
+        assert prompt.startswith(MedicalAnalysisService._static_header("hi"))
+        assert "Some text" not in MedicalAnalysisService._static_header("hi")
+
+    def test_uncached_request_is_one_user_turn(self, analysis_service):
+        tail = analysis_service._dynamic_tail("Some text")
+        with patch("app.services.medical_analysis.settings.BEDROCK_PROMPT_CACHING", False):
+            req = analysis_service._converse_request(tail, "en")
+        assert "system" not in req
+        assert req["messages"][0]["content"][0]["text"] == MedicalAnalysisService._static_header("en") + tail
+
+    def test_cached_request_sends_header_as_system_block(self, analysis_service):
+        tail = analysis_service._dynamic_tail("Some text")
+        with patch("app.services.medical_analysis.settings.BEDROCK_PROMPT_CACHING", True):
+            req = analysis_service._converse_request(tail, "en")
+        assert req["system"] == [
+            {"text": MedicalAnalysisService._static_header("en")},
+            {"cachePoint": {"type": "default"}},
+        ]
+        assert req["messages"][0]["content"][0]["text"] == tail
+
 
 class TestResponseParsing:
     """Tests for LLM response parsing."""
 
-    def setup_method(self):
-        self.service = MedicalAnalysisService()
-
-    def test_parse_valid_json(self):
+    def test_parse_valid_json(self, analysis_service):
         raw = json.dumps({"summary": "Test", "key_findings": []})
-        result = self.service._parse_analysis_response(raw)
+        result = analysis_service._parse_analysis_response(raw)
         assert result["summary"] == "Test"
 
-    def test_parse_json_in_code_block(self):
+    def test_parse_json_in_code_block(self, analysis_service):
         raw = '```json\n{"summary": "Test", "key_findings": []}\n```'
-        result = self.service._parse_analysis_response(raw)
+        result = analysis_service._parse_analysis_response(raw)
         assert result["summary"] == "Test"
 
-    def test_parse_json_in_generic_code_block(self):
+    def test_parse_json_in_generic_code_block(self, analysis_service):
         raw = '```\n{"summary": "Test"}\n```'
-        result = self.service._parse_analysis_response(raw)
+        result = analysis_service._parse_analysis_response(raw)
         assert result["summary"] == "Test"
 
-    def test_parse_json_embedded_in_text(self):
+    def test_parse_json_embedded_in_text(self, analysis_service):
         raw = 'Here is the analysis:\n{"summary": "Test", "key_findings": []}\nDone.'
-        result = self.service._parse_analysis_response(raw)
+        result = analysis_service._parse_analysis_response(raw)
         assert result["summary"] == "Test"
 
-    def test_parse_completely_malformed(self):
+    def test_parse_completely_malformed(self, analysis_service):
         raw = "This is not JSON at all."
-        result = self.service._parse_analysis_response(raw)
+        result = analysis_service._parse_analysis_response(raw)
         # Should return fallback structure
         assert "summary" in result
         assert "questions_for_doctor" in result
         assert len(result["questions_for_doctor"]) == 5
 
+    def test_malformed_fallbacks_do_not_share_lists(self, analysis_service):
+        first = analysis_service._parse_analysis_response("not JSON")
+        first["questions_for_doctor"].append("Extra question")
+        second = analysis_service._parse_analysis_response("still not JSON")
+        assert len(second["questions_for_doctor"]) == 5
+        assert second["summary"] == "still not JSON"
+
 
 class TestConfidenceCalculation:
     """Tests for the confidence scoring system."""
 
-    def setup_method(self):
-        self.service = MedicalAnalysisService()
-
-    def test_base_confidence(self):
+    def test_base_confidence(self, analysis_service):
         analysis = {"key_findings": [{"a": 1}, {"b": 2}, {"c": 3}], "confidence_notes": ""}
-        score = self.service._calculate_confidence(analysis, 90, "A" * 500)
+        score = analysis_service._calculate_confidence(analysis, 90, "A" * 500)
         assert 70 <= score <= 95
 
-    def test_low_ocr_penalized(self):
+    def test_low_ocr_penalized(self, analysis_service):
         analysis = {"key_findings": [{"a": 1}] * 5, "confidence_notes": ""}
-        high_ocr = self.service._calculate_confidence(analysis, 95, "A" * 500)
-        low_ocr = self.service._calculate_confidence(analysis, 50, "A" * 500)
+        high_ocr = analysis_service._calculate_confidence(analysis, 95, "A" * 500)
+        low_ocr = analysis_service._calculate_confidence(analysis, 50, "A" * 500)
         assert high_ocr > low_ocr
 
-    def test_no_findings_penalized(self):
+    def test_no_findings_penalized(self, analysis_service):
         with_findings = {"key_findings": [{"a": 1}] * 5, "confidence_notes": ""}
         without_findings = {"key_findings": [], "confidence_notes": ""}
-        s1 = self.service._calculate_confidence(with_findings, 90, "A" * 500)
-        s2 = self.service._calculate_confidence(without_findings, 90, "A" * 500)
+        s1 = analysis_service._calculate_confidence(with_findings, 90, "A" * 500)
+        s2 = analysis_service._calculate_confidence(without_findings, 90, "A" * 500)
         assert s1 > s2
 
-    def test_short_text_penalized(self):
+    def test_short_text_penalized(self, analysis_service):
         analysis = {"key_findings": [{"a": 1}] * 5, "confidence_notes": ""}
-        long_text = self.service._calculate_confidence(analysis, 90, "A" * 500)
-        short_text = self.service._calculate_confidence(analysis, 90, "A" * 50)
+        long_text = analysis_service._calculate_confidence(analysis, 90, "A" * 500)
+        short_text = analysis_service._calculate_confidence(analysis, 90, "A" * 50)
         assert long_text > short_text
 
-    def test_uncertainty_words_penalized(self):
+    def test_uncertainty_words_penalized(self, analysis_service):
         certain = {"key_findings": [{"a": 1}] * 5, "confidence_notes": "Clear results."}
         uncertain = {"key_findings": [{"a": 1}] * 5, "confidence_notes": "I'm uncertain about several values."}
-        s1 = self.service._calculate_confidence(certain, 90, "A" * 500)
-        s2 = self.service._calculate_confidence(uncertain, 90, "A" * 500)
+        s1 = analysis_service._calculate_confidence(certain, 90, "A" * 500)
+        s2 = analysis_service._calculate_confidence(uncertain, 90, "A" * 500)
         assert s1 > s2
 
-    def test_score_clamped_to_range(self):
+    def test_extraction_tiers_by_text_length(self, analysis_service):
+        tiers = {}
+        for length in (99, 100, 299, 300):
+            analysis = {"key_findings": [{"a": 1}] * 2, "confidence_notes": ""}
+            analysis_service._calculate_confidence(analysis, 90, "A" * length)
+            tiers[length] = analysis["confidence_breakdown"]["extraction_completeness"]
+        assert tiers == {99: 20.0, 100: 40.0, 299: 40.0, 300: 70.0}
+
+    def test_uncertainty_phrases_counted_once_each(self, analysis_service):
+        analysis = {
+            "key_findings": [],
+            "confidence_notes": "Unclear scan, unclear values; partial/limited data.",
+        }
+        analysis_service._calculate_confidence(analysis, 90, "A" * 500)
+        # three distinct phrases (unclear, partial, limited) -> 100 - 3 * 20
+        assert analysis["confidence_breakdown"]["llm_self_evaluation"] == 40.0
+
+    def test_uncertainty_phrases_case_insensitive(self, analysis_service):
+        upper = {"key_findings": [], "confidence_notes": "UNCLEAR and Unclear"}
+        missing = {"key_findings": [], "confidence_notes": None}
+        analysis_service._calculate_confidence(upper, 90, "A" * 500)
+        analysis_service._calculate_confidence(missing, 90, "A" * 500)
+        assert upper["confidence_breakdown"]["llm_self_evaluation"] == 80.0
+        assert missing["confidence_breakdown"]["llm_self_evaluation"] == 100.0
+
+    def test_score_clamped_to_range(self, analysis_service):
         # Even with all penalties, should not go below 10
         worst_case = {"key_findings": [], "confidence_notes": "uncertain and unclear"}
-        score = self.service._calculate_confidence(worst_case, 30, "x")
+        score = analysis_service._calculate_confidence(worst_case, 30, "x")
         assert 10 <= score <= 95
 
 
 class TestLocalAbnormalDetection:
     """Tests for the local regex-based abnormal value cross-check."""
 
-    def setup_method(self):
-        self.service = MedicalAnalysisService()
-
-    def test_detects_high_glucose(self):
+    def test_detects_high_glucose(self, analysis_service):
         text = "Glucose: 280 mg/dL"
-        results = self.service._detect_abnormal_values_locally(text)
+        results = analysis_service._detect_abnormal_values_locally(text)
         glucose = [r for r in results if r["test_name"] == "glucose"]
         assert len(glucose) == 1
         assert glucose[0]["status"] == "high"
         assert glucose[0]["extracted_value"] == 280.0
 
-    def test_detects_low_hemoglobin(self):
+    def test_detects_low_hemoglobin(self, analysis_service):
         text = "Hemoglobin: 8.2 g/dL"
-        results = self.service._detect_abnormal_values_locally(text)
+        results = analysis_service._detect_abnormal_values_locally(text)
         hb = [r for r in results if r["test_name"] == "hemoglobin"]
         assert len(hb) == 1
         assert hb[0]["status"] == "low"
 
-    def test_detects_normal_value(self):
+    def test_detects_normal_value(self, analysis_service):
         text = "Sodium: 140 mEq/L"
-        results = self.service._detect_abnormal_values_locally(text)
+        results = analysis_service._detect_abnormal_values_locally(text)
         na = [r for r in results if r["test_name"] == "sodium"]
         assert len(na) == 1
         assert na[0]["status"] == "normal"
 
-    def test_multiple_values(self, sample_medical_text):
-        results = self.service._detect_abnormal_values_locally(sample_medical_text)
+    def test_multiple_values(self, analysis_service, sample_medical_text):
+        results = analysis_service._detect_abnormal_values_locally(sample_medical_text)
         test_names = [r["test_name"] for r in results]
         assert "hemoglobin" in test_names or "hb" in test_names
         assert any(r["status"] in ("high", "low") for r in results)
 
-    def test_unknown_test_skipped(self):
+    def test_mixed_case_multiword_name(self, analysis_service):
+        results = analysis_service._detect_abnormal_values_locally("FASTING Glucose - 126 mg/dL")
+        assert results[0]["test_name"] == "fasting glucose"
+        assert results[0]["reference_range"] == "70-100 mg/dL"
+        assert results[0]["status"] == "high"
+
+    def test_text_without_values_skipped(self, analysis_service):
+        assert analysis_service._detect_abnormal_values_locally("Hemoglobin: low") == []
+        assert analysis_service._detect_abnormal_values_locally("t3") == []
+        assert analysis_service._detect_abnormal_values_locally("t3 9")[0]["test_name"] == "t3"
+
+    def test_unknown_test_skipped(self, analysis_service):
         text = "FooBarTest: 999 units"
-        results = self.service._detect_abnormal_values_locally(text)
+        results = analysis_service._detect_abnormal_values_locally(text)
         assert len(results) == 0
 
-    def test_reference_ranges_populated(self):
+    def test_reference_ranges_populated(self, analysis_service):
         """Sanity check that REFERENCE_RANGES has expected tests."""
-        refs = self.service.REFERENCE_RANGES
+        refs = analysis_service.REFERENCE_RANGES
         assert "hemoglobin" in refs
         assert "glucose" in refs
         assert "creatinine" in refs
         assert "tsh" in refs
         assert "potassium" in refs
+        assert refs["hemoglobin"].female == (12.0, 16.0)
+        assert refs["glucose"].male is None
+
+    def test_range_arrays_match_reference_ranges(self):
+        svc = MedicalAnalysisService
+        for name, ref in svc.REFERENCE_RANGES.items():
+            pos = svc._RANGE_INDEX[name]
+            assert (svc._RANGE_LOW[pos], svc._RANGE_HIGH[pos]) == (ref.low, ref.high)
+            assert svc._RANGE_LABEL[pos].endswith(ref.unit)
+
+    def test_value_pattern_compiled_once(self, analysis_service):
+        pattern = MedicalAnalysisService._VALUE_PATTERN
+        analysis_service._detect_abnormal_values_locally("Glucose: 280 mg/dL")
+        assert MedicalAnalysisService._VALUE_PATTERN is pattern
+
+    def test_re2_equivalence(self, sample_medical_text):
+        """The scan engine (RE2 when installed) matches what stdlib re finds."""
+        reference = re.compile(MedicalAnalysisService._VALUE_PATTERN.pattern)
+        expected = [m.groups() for m in reference.finditer(sample_medical_text)]
+        actual = [
+            m.groups()
+            for m in MedicalAnalysisService._VALUE_PATTERN.finditer(sample_medical_text)
+        ]
+        assert actual == expected
+        assert expected
 
 
 class TestMedicalAnalysisIntegration:
@@ -208,6 +308,23 @@ class TestMedicalAnalysisIntegration:
         assert "model" in result
         assert result["language"] == "en"
 
+    @pytest.mark.asyncio
+    async def test_analyze_caches_static_prompt_prefix(self, sample_medical_text):
+        mock = MagicMock()
+        mock.converse.return_value = {"output": {"message": {"content": [{"text": "{}"}]}}}
+        with patch("app.services.medical_analysis.settings.BEDROCK_PROMPT_CACHING", True):
+            await self.service.analyze(
+                bedrock_runtime=mock,
+                extracted_text=sample_medical_text,
+                language="hi",
+            )
+        kwargs = mock.converse.call_args.kwargs
+        assert kwargs["system"][0]["text"] == MedicalAnalysisService._static_header("hi")
+        assert "cachePoint" in kwargs["system"][-1]
+        user_text = kwargs["messages"][0]["content"][0]["text"]
+        assert sample_medical_text in user_text
+        assert "IMPORTANT RULES" not in user_text
+
     @pytest.mark.asyncio
     async def test_analyze_with_low_confidence_text(self, mock_bedrock_runtime):
         result = await self.service.analyze(
@@ -219,10 +336,56 @@ class TestMedicalAnalysisIntegration:
         # Confidence should be lower due to short text + low OCR
         assert result["confidence"] < 80
 
+    @pytest.mark.asyncio
+    async def test_analyze_cached(self, mock_bedrock_runtime, sample_medical_text):
+        mock = MagicMock()
+        mock.converse.return_value = mock_bedrock_runtime.converse.return_value
+        first = await self.service.analyze(
+            bedrock_runtime=mock, extracted_text=sample_medical_text, ocr_confidence=92.0
+        )
+        second = await self.service.analyze(
+            bedrock_runtime=mock, extracted_text=sample_medical_text, ocr_confidence=40.0
+        )
+        assert mock.converse.call_count == 1
+        assert second["summary"] == first["summary"]
+        # confidence is still scored against the current OCR confidence
+        assert second["confidence"] < first["confidence"]
+        await self.service.analyze(
+            bedrock_runtime=mock, extracted_text=sample_medical_text, language="hi"
+        )
+        assert mock.converse.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_analyze_does_not_cache_unparsed_reply(self):
+        mock = MagicMock()
+        mock.converse.return_value = {
+            "output": {"message": {"content": [{"text": "Not JSON at all."}]}}
+        }
+        for _ in range(2):
+            result = await self.service.analyze(
+                bedrock_runtime=mock, extracted_text="Hemoglobin: 8.2 g/dL"
+            )
+            assert result["summary"] == "Not JSON at all."
+        assert mock.converse.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_analyze_calls_bedrock_off_event_loop(self, mock_bedrock_runtime):
+        caller = threading.current_thread()
+        threads = []
+
+        def converse(**kwargs):
+            threads.append(threading.current_thread())
+            return mock_bedrock_runtime.converse.return_value
+
+        mock = MagicMock()
+        mock.converse.side_effect = converse
+        await self.service.analyze(bedrock_runtime=mock, extracted_text="Hemoglobin: 8.2 g/dL")
+        assert threads and threads[0] is not caller
+
     @pytest.mark.asyncio
     async def test_analyze_bedrock_failure(self):
         mock = MagicMock()
-        mock.invoke_model.side_effect = Exception("Bedrock unavailable")
+        mock.converse.side_effect = Exception("Bedrock unavailable")
         with pytest.raises(Exception, match="Bedrock unavailable"):
             await self.service.analyze(
                 bedrock_runtime=mock,
@@ -36,6 +36,8 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 import pytest
 
+import app.services.pii_anonymizer as pii
+
 # Import directly from the module file to avoid the aws_service import chain
 from app.services.pii_anonymizer import (
     PIIAnonymiser,
@@ -71,6 +73,14 @@ class TestVerhoeffChecksum:
     def test_empty_input(self):
         assert _verhoeff_checksum("") is False
 
+    def test_known_check_digit(self):
+        # 236 has Verhoeff check digit 3
+        assert _verhoeff_checksum("2363") is True
+        assert _verhoeff_checksum("2364") is False
+
+    def test_non_ascii_digits_validated(self):
+        assert _verhoeff_checksum("२३६३") is True
+
 
 class TestLuhnChecksum:
     """Luhn checksum used for credit/debit card validation."""
@@ -90,6 +100,9 @@ class TestLuhnChecksum:
     def test_single_digit(self):
         assert _luhn_checksum("5") is False
 
+    def test_separators_ignored(self):
+        assert _luhn_checksum("4111-1111 1111-1111") is True
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 #  Regex detection – Indian Government IDs
@@ -185,6 +198,32 @@ class TestUPIDetection:
         upi = [e for e in entities if e.entity_type == "UPI_ID"]
         assert len(upi) == 1
 
+    def test_every_provider_detected(self):
+        for provider in pii._UPI_PROVIDERS:
+            entities = _regex_detect(f"Pay rajesh@{provider} now")
+            assert [e.text for e in entities if e.entity_type == "UPI_ID"] == [f"rajesh@{provider}"]
+
+
+class TestRegexOpt:
+    """Prefix-factored literal alternations used by the DL / UPI patterns."""
+
+    def test_shared_prefix_is_factored(self):
+        assert pii._regex_opt(["okaxis", "okicici"]) == "ok(?:axis|icici)"
+
+    def test_word_that_prefixes_another(self):
+        pattern = re.compile("(?:" + pii._regex_opt(["a", "ab", "abc", "b"]) + r")\Z")
+        for word in ("a", "ab", "abc", "b"):
+            assert pattern.match(word)
+        for word in ("", "ac", "abcd", "bb"):
+            assert not pattern.match(word)
+
+    def test_matches_exactly_the_state_codes(self):
+        pattern = re.compile("(?:" + pii._regex_opt(pii._DL_STATE_CODES) + r")\Z")
+        codes = set(pii._DL_STATE_CODES)
+        for a in "ABCDEFGHIJKLMNOPQRSTUVWXYZ":
+            for b in "ABCDEFGHIJKLMNOPQRSTUVWXYZ":
+                assert bool(pattern.match(a + b)) == (a + b in codes)
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 #  Regex detection – Contact info
@@ -406,6 +445,85 @@ class TestMedicalContextSuppression:
         phones = [e for e in entities if e.entity_type == "PHONE"]
         assert len(phones) == 0
 
+    def test_every_keyword_marks_its_line_medical(self):
+        for kw in pii._MEDICAL_CONTEXT_KEYWORDS:
+            text = f"Call 9876543210\nValue 12345 {kw.upper()} here"
+            assert pii._is_medical_context(text, 22, 27), kw
+            assert not pii._is_medical_context(text, 5, 15), kw
+
+    def test_line_index_matches_direct_scan(self):
+        text = "Hemoglobin: 8.2 g/dL\nPhone 9876543210\n\nTSH 4.5"
+        breaks = pii._line_breaks(text)
+        assert breaks == [20, 37, 38]
+        for start in range(len(text)):
+            for end in range(start, len(text) + 1):
+                assert pii._is_medical_context(text, start, end, breaks) == pii._is_medical_context(
+                    text, start, end
+                )
+
+    def test_line_cache_matches_direct_scan(self):
+        text = "Hemoglobin: 8.2 g/dL\nPhone 9876543210\n\nTSH 4.5"
+        breaks = pii._line_breaks(text)
+        cache = {}
+        for start in range(len(text)):
+            for end in range(start, len(text) + 1):
+                assert pii._is_medical_context(
+                    text, start, end, breaks, cache
+                ) == pii._is_medical_context(text, start, end)
+        assert len(cache) < len(text)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+#  Regex detection – one-pass prefilter
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class _FakePatternSet:
+    """Stands in for an RE2 set: loosened sources, evaluated with ``re``."""
+
+    def __init__(self):
+        self._sources = [
+            re.compile(pii._LOOKAROUND.sub("", p.pattern.pattern), p.pattern.flags)
+            for p in pii._PATTERNS
+        ]
+        self.calls = 0
+
+    def Match(self, text):
+        self.calls += 1
+        return [i for i, p in enumerate(self._sources) if p.search(text)]
+
+
+class TestRegexPrefilter:
+    TEXTS = [
+        "Mr. Rajesh Kumar, PAN: ABCPK1234A, Phone: +91-9876543210",
+        "Email: rajesh@gmail.com, UPI: rajesh@paytm, IFSC: SBIN0001234",
+        "Hemoglobin: 8.2 g/dL (Ref: 14.0-18.0 g/dL)",
+        "Nothing to see here.",
+    ]
+
+    def test_prefiltered_detection_matches_full_scan(self, monkeypatch):
+        expected = [_regex_detect(t) for t in self.TEXTS]
+        fake = _FakePatternSet()
+        monkeypatch.setattr(pii, "_PREFILTER", fake)
+        assert [_regex_detect(t) for t in self.TEXTS] == expected
+        assert fake.calls == len(self.TEXTS)
+
+    def test_non_ascii_text_runs_every_pattern(self, monkeypatch):
+        fake = _FakePatternSet()
+        monkeypatch.setattr(pii, "_PREFILTER", fake)
+        text = "फोन: +91-9876543210, ईमेल: rajesh@gmail.com"
+        assert pii._candidate_patterns(text) == pii._PATTERNS
+        assert fake.calls == 0
+
+    def test_without_set_digit_free_text_skips_numeric_patterns(self, monkeypatch):
+        monkeypatch.setattr(pii, "_PREFILTER", None)
+        candidates = pii._candidate_patterns("Patient Name: Rajesh Kumar")
+        assert candidates
+        assert all(p.requires is None for p in candidates)
+        for text in self.TEXTS:
+            skipped = [p for p in pii._PATTERNS if p not in pii._candidate_patterns(text)]
+            assert not any(p.pattern.search(text) for p in skipped)
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 #  PIIMapping
@@ -432,6 +550,12 @@ class TestPIIMapping:
         assert p1 == "[NAME_1]"
         assert p2 == "[NAME_2]"
 
+    def test_bind_registers_both_directions(self):
+        mapping = PIIMapping()
+        mapping.bind("[NAME:abc123]", "Rajesh Kumar")
+        assert mapping.placeholder_to_original["[NAME:abc123]"] == "Rajesh Kumar"
+        assert mapping.add("NAME", "Rajesh Kumar") == "[NAME:abc123]"
+
     def test_deanonymise(self):
         mapping = PIIMapping()
         mapping.add("NAME", "Rajesh Kumar")
@@ -442,6 +566,14 @@ class TestPIIMapping:
         assert "9876543210" in restored
         assert "[NAME_1]" not in restored
 
+    def test_deanonymise_longer_placeholder_and_later_add(self):
+        mapping = PIIMapping()
+        for i in range(10):
+            mapping.add("NAME", f"Person {i + 1}")
+        assert mapping.deanonymise("[NAME_1] [NAME_10]") == "Person 1 Person 10"
+        mapping.add("NAME", "Person 11")
+        assert mapping.deanonymise("[NAME_11]") == "Person 11"
+
     def test_serialisation_roundtrip(self):
         mapping = PIIMapping()
         mapping.add("NAME", "Rajesh Kumar")
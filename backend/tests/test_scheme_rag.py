@@ -0,0 +1,277 @@
+"""
+Tests for the Scheme RAG Service.
+Covers: eligibility parsing, post-retrieval filtering, prompt formatting, RAG response caching.
+"""
+
+import io
+import json
+import pytest
+from unittest.mock import MagicMock
+
+from app.services.scheme_rag import (
+    BedrockEmbeddingIndex,
+    SchemeRAGService,
+    scheme_rag_service,
+)
+from app.services.session_store import scheme_cache
+
+
+SAMPLE_SCHEMES = [
+    {
+        "id": "pmjay",
+        "name": "Ayushman Bharat PM-JAY",
+        "type": "insurance",
+        "coverage": "Up to ₹5 lakh",
+        "state": "all_india",
+        "bpl_required": True,
+        "age_criteria": "No restriction",
+        "income_criteria": "BPL families only",
+        "helpline": "14555",
+    },
+    {
+        "id": "senior",
+        "name": "Senior Citizen Health Scheme",
+        "type": "insurance",
+        "coverage": "Up to ₹1 lakh",
+        "state": "all_india",
+        "bpl_required": False,
+        "age_criteria": "Above 60 years",
+        "income_criteria": "None – universal for elderly",
+    },
+    {
+        "id": "ka_arogya",
+        "name": "Karnataka Arogya",
+        "type": "insurance",
+        "coverage": "Up to ₹1.5 lakh",
+        "state": "karnataka",
+        "bpl_required": False,
+        "age_criteria": "18 to 70 years",
+        "income_criteria": "Annual family income below ₹1,00,000",
+    },
+    {
+        "id": "tn_cmchis",
+        "name": "Tamil Nadu CMCHIS",
+        "type": "insurance",
+        "coverage": "Up to ₹5 lakh",
+        "state": "tamil_nadu",
+        "bpl_required": False,
+        "age_criteria": "All ages",
+        "income_criteria": "Annual family income ≤ ₹72,000",
+    },
+]
+
+
+def _make_service():
+    """Service with SAMPLE_SCHEMES loaded and a mocked embedding index."""
+    service = SchemeRAGService()
+    service._schemes = SAMPLE_SCHEMES
+    service._scheme_docs = [service._scheme_to_text(s) for s in SAMPLE_SCHEMES]
+    service._build_eligibility_arrays()
+    service._prompt_blobs = {
+        s["id"]: service._scheme_prompt_blob(s) for s in SAMPLE_SCHEMES
+    }
+    service._initialised = True
+    service._index.query = MagicMock(
+        side_effect=lambda text, top_k=10, partitions=None: [
+            (i, 0.9 - i * 0.1) for i in range(len(SAMPLE_SCHEMES))
+        ][:top_k]
+    )
+    return service
+
+
+# Fixed 3-d "embeddings" keyed by input text
+_VECTORS = {
+    "doc-ka": [1.0, 0.0, 0.0],
+    "doc-tn": [0.9, 0.1, 0.0],
+    "doc-all": [0.5, 0.5, 0.0],
+    "query": [1.0, 0.0, 0.0],
+}
+
+
+def _fake_bedrock():
+    def invoke_model(**kwargs):
+        text = json.loads(kwargs["body"])["inputText"]
+        return {"body": io.BytesIO(json.dumps({"embedding": _VECTORS[text]}).encode())}
+
+    bedrock = MagicMock()
+    bedrock.invoke_model.side_effect = invoke_model
+    return bedrock
+
+
+class TestEmbeddingIndex:
+    """Tests for BedrockEmbeddingIndex scoring and partitioned queries."""
+
+    def setup_method(self):
+        self.index = BedrockEmbeddingIndex()
+        self.index.build(
+            documents=["doc-ka", "doc-tn", "doc-all"],
+            bedrock_runtime=_fake_bedrock(),
+            model_id="titan",
+            partitions=["karnataka", "tamil_nadu", "all_india"],
+        )
+
+    def test_results_sorted_by_cosine(self):
+        results = self.index.query("query", top_k=3)
+        assert [idx for idx, _ in results] == [0, 1, 2]
+        assert results[0][1] == pytest.approx(1.0)
+
+    def test_partitioned_query_skips_other_buckets(self):
+        results = self.index.query("query", partitions=["karnataka", "all_india"])
+        assert [idx for idx, _ in results] == [0, 2]
+
+    def test_unknown_partition_returns_nothing(self):
+        assert self.index.query("query", partitions=["kerala"]) == []
+
+
+class TestEligibilityParsing:
+    """Tests for age / income criteria parsing."""
+
+    def test_age_range(self):
+        assert SchemeRAGService._parse_age_bounds("18 to 70 years") == (18, 70)
+
+    def test_age_above(self):
+        lo, hi = SchemeRAGService._parse_age_bounds("Above 60 years")
+        assert lo == 60
+        assert hi > 120
+
+    def test_age_no_restriction(self):
+        for criteria in ("No restriction", ""):
+            lo, hi = SchemeRAGService._parse_age_bounds(criteria)
+            assert lo == 0
+            assert hi > 120
+
+    def test_age_below(self):
+        assert SchemeRAGService._parse_age_bounds("Below 18 years") == (0, 18)
+
+    def test_income_cap_parsed(self):
+        scheme = {"income_criteria": "Annual family income below ₹1,00,000"}
+        assert SchemeRAGService._parse_income_cap(scheme) == 100_000
+
+    def test_income_cap_with_symbol_parsed(self):
+        scheme = {"income_criteria": "Annual family income ≤ ₹72,000"}
+        assert SchemeRAGService._parse_income_cap(scheme) == 72_000
+
+    def test_income_universal_has_no_cap(self):
+        uncapped = SchemeRAGService._parse_income_cap({"income_criteria": "None – universal"})
+        assert uncapped >= 10_000_000
+        assert SchemeRAGService._parse_income_cap({}) == uncapped
+
+    def test_medical_keywords_extracted(self):
+        text = "HbA1c 8.2% suggests Diabetes; Creatinine normal"
+        keywords = SchemeRAGService._extract_medical_keywords(text)
+        assert "diabetes" in keywords.split()
+        assert "creatinine" in keywords.split()
+
+
+class TestRetrieveFiltering:
+    """Tests for the post-retrieval hard filters."""
+
+    def setup_method(self):
+        self.service = _make_service()
+
+    def _ids(self, **kwargs):
+        return [s["id"] for s in self.service.retrieve(**kwargs)]
+
+    def test_state_filter(self):
+        ids = self._ids(state="Karnataka", is_bpl=True)
+        assert "ka_arogya" in ids
+        assert "tn_cmchis" not in ids
+
+    def test_bpl_filter(self):
+        assert "pmjay" not in self._ids(state="Karnataka", is_bpl=False)
+        assert "pmjay" in self._ids(state="Karnataka", is_bpl=True)
+
+    def test_age_filter(self):
+        assert "senior" not in self._ids(state="Karnataka", age=40)
+        assert "senior" in self._ids(state="Karnataka", age=65)
+
+    def test_income_filter(self):
+        assert "ka_arogya" in self._ids(state="Karnataka", income_range="below-1l")
+        assert "ka_arogya" not in self._ids(state="Karnataka", income_range="3l-5l")
+
+    def test_results_carry_match_metadata(self):
+        results = self.service.retrieve(state="Karnataka", age=30)
+        assert results
+        assert all("relevance_score" in r and "match_factors" in r for r in results)
+
+
+class TestPromptFormatting:
+    """Tests for the scheme context written into the LLM prompt."""
+
+    def setup_method(self):
+        self.service = _make_service()
+
+    def test_schemes_numbered_in_rank_order(self):
+        text = self.service._format_schemes_for_prompt(SAMPLE_SCHEMES[:2])
+        assert text.startswith("[1] Ayushman Bharat PM-JAY (ID: pmjay)")
+        assert "[2] Senior Citizen Health Scheme" in text
+
+    def test_prompt_capped_to_top_schemes(self):
+        many = [{**SAMPLE_SCHEMES[0], "id": f"s{i}"} for i in range(8)]
+        text = self.service._format_schemes_for_prompt(many)
+        assert "[5]" in text
+        assert "[6]" not in text
+
+
+class TestRAGResponseCache:
+    """Tests for memoisation of the full RAG pipeline."""
+
+    def setup_method(self):
+        self.service = _make_service()
+        scheme_cache._cache.clear()
+
+    def _bedrock(self):
+        mock = MagicMock()
+        mock.converse.return_value = {
+            "output": {"message": {"content": [{"text": json.dumps({
+                "summary": "Consider PM-JAY.",
+                "recommendations": [{"scheme_id": "pmjay", "why_relevant": "BPL"}],
+            })}]}}
+        }
+        return mock
+
+    @pytest.mark.asyncio
+    async def test_identical_request_served_from_cache(self):
+        bedrock = self._bedrock()
+        profile = {"state": "Karnataka", "age": 40, "is_bpl": True}
+        first = await self.service.generate_rag_response(bedrock, profile)
+        second = await self.service.generate_rag_response(bedrock, profile)
+        assert first["rag_used"] is True
+        assert second == first
+        assert bedrock.converse.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_different_language_not_shared(self):
+        bedrock = self._bedrock()
+        profile = {"state": "Karnataka", "age": 40, "is_bpl": True}
+        await self.service.generate_rag_response(bedrock, profile, language="en")
+        await self.service.generate_rag_response(bedrock, profile, language="hi")
+        assert bedrock.converse.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_generation_not_cached(self):
+        bedrock = self._bedrock()
+        bedrock.converse.side_effect = Exception("Bedrock unavailable")
+        profile = {"state": "Karnataka", "age": 40, "is_bpl": True}
+        result = await self.service.generate_rag_response(bedrock, profile)
+        assert result["rag_used"] is False
+        await self.service.generate_rag_response(bedrock, profile)
+        assert bedrock.converse.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_unparsed_reply_not_cached(self):
+        bedrock = self._bedrock()
+        bedrock.converse.return_value = {
+            "output": {"message": {"content": [{"text": "Consider PM-JAY."}]}}
+        }
+        profile = {"state": "Karnataka", "age": 40, "is_bpl": True}
+        result = await self.service.generate_rag_response(bedrock, profile)
+        assert result["summary"] == "Consider PM-JAY."
+        await self.service.generate_rag_response(bedrock, profile)
+        assert bedrock.converse.call_count == 2
+
+
+class TestGlobalSchemeRAGInstance:
+    def test_global_instance_exists(self):
+        assert scheme_rag_service is not None
+        assert isinstance(scheme_rag_service, SchemeRAGService)
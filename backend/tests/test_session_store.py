@@ -67,6 +67,33 @@ class TestSessionStore:
         store._store["s1"]["updated_at"] = datetime.now() - timedelta(minutes=1)
         assert store.get("s1") is None
 
+    def test_create_drops_expired_sessions(self):
+        """Expired sessions at the LRU head are purged when a new one is created."""
+        self.store.create("s1", {"data": "old"})
+        self.store.create("s2", {"data": "fresh"})
+        self.store._store["s1"]["updated_at"] = datetime.now() - timedelta(minutes=5)
+        self.store.create("s3", {"data": "new"})
+        assert list(self.store._store.keys()) == ["s2", "s3"]
+
+    def test_periodic_sweep_drops_expired_behind_live_head(self):
+        """Expired sessions past the LRU head are purged every SWEEP_EVERY writes."""
+        self.store.SWEEP_EVERY = 3
+        self.store.create("s1", {"data": "live"})
+        self.store.create("s2", {"data": "stale"})
+        self.store._store["s2"]["updated_at"] = datetime.now() - timedelta(minutes=5)
+        assert "s2" in self.store._store  # head sweep stops at live s1
+        self.store.update("s1", {"data": "still live"})  # third write
+        assert list(self.store._store.keys()) == ["s1"]
+
+    def test_full_store_purges_expired_before_evicting_live(self):
+        """A full store drops expired sessions anywhere before evicting the live head."""
+        for i in range(5):  # max is 5
+            self.store.create(f"s{i}", {"idx": i})
+        self.store.get("s0")  # read: moves s0 to the end, updated_at unchanged
+        self.store._store["s0"]["updated_at"] = datetime.now() - timedelta(minutes=5)
+        self.store.create("s5", {"idx": 5})
+        assert list(self.store._store.keys()) == ["s1", "s2", "s3", "s4", "s5"]
+
     def test_lru_ordering(self):
         """Accessing a session should move it to the end (most recently used)."""
         self.store.create("s1", {"data": "first"})
@@ -78,6 +105,14 @@ class TestSessionStore:
         keys = list(self.store._store.keys())
         assert keys[-1] == "s1"
 
+    def test_recreate_moves_to_end_without_eviction(self):
+        """Re-creating a live session refreshes its LRU slot and evicts nothing."""
+        for i in range(5):  # max is 5
+            self.store.create(f"s{i}", {"idx": i})
+        self.store.create("s0", {"idx": "again"})
+        assert list(self.store._store.keys()) == ["s1", "s2", "s3", "s4", "s0"]
+        assert self.store.get("s0")["idx"] == "again"
+
     def test_concurrent_access_safety(self):
         """Basic check that the lock doesn't deadlock on sequential ops."""
         self.store.create("s1", {"data": "a"})
@@ -113,7 +148,7 @@ class TestQueryCache:
         cache.set("test", "en", {"data": "value"})
         # Force time-based expiry by setting timestamp in the past
         key = cache._make_key("test", "en")
-        cache._cache[key]["timestamp"] = time.time() - 1
+        cache._cache[key].expires_at = time.monotonic() - 1
         assert cache.get("test", "en") is None
 
     def test_max_entries_eviction(self):
@@ -124,6 +159,16 @@ class TestQueryCache:
         assert self.cache.get("a", "en") is None
         assert self.cache.get("d", "en")["v"] == 4
 
+    def test_reset_refreshes_entry_without_eviction(self):
+        self.cache.set("a", "en", {"v": 1})
+        self.cache.set("b", "en", {"v": 2})
+        self.cache.set("c", "en", {"v": 3})
+        self.cache.set("a", "en", {"v": 10})  # already cached: nothing evicted
+        self.cache.set("d", "en", {"v": 4})  # should evict "b", now the oldest
+        assert self.cache.get("a", "en")["v"] == 10
+        assert self.cache.get("b", "en") is None
+        assert self.cache.get("c", "en")["v"] == 3
+
     def test_invalidate(self):
         self.cache.set("test", "en", {"data": "value"})
         self.cache.invalidate("test", "en")
@@ -143,6 +188,11 @@ class TestQueryCache:
         k2 = QueryCache._make_key("text2", "en")
         assert k1 != k2
 
+    def test_key_uses_first_500_chars(self):
+        key = QueryCache._make_key("x" * 5000, "hi")
+        assert key == QueryCache._make_key("x" * 500 + "y", "hi")
+        assert key != QueryCache._make_key("x" * 5000, "en")
+
 
 class TestGlobalInstances:
     """Ensure global singletons are properly initialized."""
@@ -4,7 +4,7 @@ Covers: message formatting, phone validation, multilingual output, SNS integrati
 """
 
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 from app.services.sms_service import SMSService, sms_service
 
@@ -113,6 +113,18 @@ class TestSMSServiceFormatting:
         msg = self.service._format_summary_sms(long_analysis, language="en")
         assert len(msg) <= SMSService.MAX_SMS_LENGTH
 
+    def test_footer_kept_when_truncated(self):
+        long_analysis = {
+            **self.analysis,
+            "emergency": {
+                "has_emergency": True,
+                "alerts": [{"test_name": "Glucose", "message": "X" * 1000}] * 3,
+            },
+        }
+        msg = self.service._format_summary_sms(long_analysis, language="en")
+        assert len(msg) <= SMSService.MAX_SMS_LENGTH
+        assert msg.endswith("Please visit a doctor. AccessAI does not diagnose.")
+
     def test_empty_analysis_still_produces_message(self):
         msg = self.service._format_summary_sms({}, language="en")
         assert "AccessAI" in msg
@@ -155,6 +167,24 @@ class TestSMSSending:
                 analysis={"summary": "Test"},
             )
 
+    @pytest.mark.asyncio
+    async def test_send_non_digit_phone(self, mock_sns_client):
+        self.service.initialize(mock_sns_client)
+        with pytest.raises(ValueError, match="Invalid phone number"):
+            await self.service.send_summary(
+                phone_number="+91987654321x",  # right length, not all digits
+                analysis={"summary": "Test"},
+            )
+
+    @pytest.mark.asyncio
+    async def test_send_non_ascii_digit_phone(self, mock_sns_client):
+        self.service.initialize(mock_sns_client)
+        with pytest.raises(ValueError, match="Invalid phone number"):
+            await self.service.send_summary(
+                phone_number="+91९८७६५४३२१०",  # Devanagari digits
+                analysis={"summary": "Test"},
+            )
+
     @pytest.mark.asyncio
     async def test_send_without_initialization(self):
         with pytest.raises(RuntimeError, match="not initialized"):
@@ -188,6 +218,74 @@ class TestSMSSending:
         assert attrs["AWS.SNS.SMS.SMSType"]["StringValue"] == "Transactional"
 
 
+class TestSMSBatchSending:
+    """Tests for multi-recipient SMS sends."""
+
+    def setup_method(self):
+        self.service = SMSService()
+
+    @pytest.mark.asyncio
+    async def test_batch_results_in_input_order(self, mock_sns_client):
+        self.service.initialize(mock_sns_client)
+        items = [
+            {"phone_number": f"+9198765432{i:02d}", "analysis": {"summary": "Test"}}
+            for i in range(23)
+        ]
+        mock_sns_client.publish.side_effect = lambda **kw: {"MessageId": "id" + kw["PhoneNumber"]}
+        results = await self.service.send_summary_batch(items)
+        assert len(results) == 23
+        assert all(r["success"] for r in results)
+        assert [r["message_id"] for r in results] == ["id" + it["phone_number"] for it in items]
+        assert mock_sns_client.publish.call_count == 23
+
+    @pytest.mark.asyncio
+    async def test_batch_invalid_phone_fails_only_its_entry(self, mock_sns_client):
+        self.service.initialize(mock_sns_client)
+        results = await self.service.send_summary_batch([
+            {"phone_number": "+919876543210", "analysis": {"summary": "Test"}},
+            {"phone_number": "12345", "analysis": {"summary": "Test"}},
+        ])
+        assert results[0]["success"] is True
+        assert results[1]["success"] is False
+        assert "Invalid phone number" in results[1]["message"]
+        mock_sns_client.publish.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_batch_missing_or_none_phone_fails_only_its_entry(self, mock_sns_client):
+        self.service.initialize(mock_sns_client)
+        results = await self.service.send_summary_batch([
+            {"analysis": {"summary": "Test"}, "phone_number": None},
+            {"phone_number": "+919876543210", "analysis": {"summary": "Test"}},
+            {"analysis": {"summary": "Test"}},
+        ])
+        assert [r["success"] for r in results] == [False, True, False]
+        assert "Invalid phone number" in results[0]["message"]
+        mock_sns_client.publish.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_batch_formats_shared_analysis_once(self, mock_sns_client):
+        self.service.initialize(mock_sns_client)
+        shared = {"summary": "Shared report"}
+        items = [
+            {"phone_number": f"+9198765432{i:02d}", "analysis": shared}
+            for i in range(5)
+        ] + [{"phone_number": "+919876543299", "analysis": shared, "language": "hi"}]
+        with patch.object(
+            self.service, "_format_summary_sms", wraps=self.service._format_summary_sms
+        ) as fmt:
+            results = await self.service.send_summary_batch(items)
+        assert all(r["success"] for r in results)
+        assert fmt.call_count == 2  # one per (analysis, language)
+        messages = {c.kwargs["Message"] for c in mock_sns_client.publish.call_args_list}
+        assert len(messages) == 2
+        assert all("Shared report" in m for m in messages)
+
+    @pytest.mark.asyncio
+    async def test_batch_without_initialization(self):
+        with pytest.raises(RuntimeError, match="not initialized"):
+            await self.service.send_summary_batch([])
+
+
 class TestGlobalSMSInstance:
     def test_global_instance_exists(self):
         assert sms_service is not None